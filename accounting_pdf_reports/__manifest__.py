@@ -18,11 +18,14 @@
     'live_test_url': 'https://www.youtube.com/watch?v=yA4NLwOLZms',
     'data': [
         'security/ir.model.access.csv',
+        'security/security.xml',
+        'data/ir_cron_data.xml',
         'data/account_account_type.xml',
         'views/menu.xml',
         'views/ledger_menu.xml',
         'views/financial_report.xml',
         'views/settings.xml',
+        'views/account_report_job_views.xml',
         'wizard/account_report_common_view.xml',
         'wizard/partner_ledger.xml',
         'wizard/general_ledger.xml',
@@ -3,3 +3,4 @@
 from . import account_account_type
 from . import account_financial_report
 from . import account_move_line
+from . import account_report_job
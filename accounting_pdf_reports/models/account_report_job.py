@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+
+_logger = logging.getLogger(__name__)
+
+
+class AccountReportJob(models.Model):
+    _name = 'account.report.job'
+    _inherit = ['mail.thread']
+    _description = 'Accounting Report Generated in Background'
+    _order = 'id desc'
+
+    name = fields.Char('Report', required=True, readonly=True)
+    report_id = fields.Many2one('ir.actions.report', 'Report Action', required=True,
+                                readonly=True, ondelete='cascade')
+    res_ids = fields.Char('Record Ids', readonly=True, default='[]')
+    active_model = fields.Char('Active Model', readonly=True,
+                               help="Model of the record the report was requested from, usually its wizard.")
+    active_id = fields.Integer('Active Id', readonly=True)
+    data = fields.Text('Report Data', readonly=True)
+    report_context = fields.Text('Report Context', readonly=True, default='{}')
+    data_hash = fields.Char('Data Hash', readonly=True, index=True,
+                            help="Identifies the requests of the same report with the same options.")
+    user_id = fields.Many2one('res.users', 'Requested By', required=True, readonly=True,
+                              default=lambda self: self.env.user)
+    company_id = fields.Many2one('res.company', 'Company', required=True, readonly=True,
+                                 default=lambda self: self.env.company)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='queued', required=True, readonly=True, index=True)
+    attachment_id = fields.Many2one('ir.attachment', 'File', readonly=True)
+    date_start = fields.Datetime('Started On', readonly=True)
+    date_done = fields.Datetime(
+        'Generated On', readonly=True,
+        help="Identical requests are answered with this file for the number of minutes set in the "
+             "accounting_pdf_reports.report_job_cache_minutes parameter (60 by default, 0 disables it): "
+             "entries posted after it was generated are not in it.")
+    error = fields.Text('Error', readonly=True)
+
+    @api.model
+    def _get_data_hash(self, report, res_ids, data, context):
+        """ Hash of a report request, ignoring the ids of the wizard it comes from """
+        data = dict(data or {})
+        if isinstance(data.get('form'), dict):
+            data['form'] = {key: value for key, value in data['form'].items() if key != 'id'}
+        data.pop('ids', None)
+        active_model = context.get('active_model')
+        if active_model in self.env and self.env[active_model]._transient:
+            res_ids = []
+        payload = json.dumps({
+            'report': report.report_name,
+            'res_ids': res_ids,
+            'data': data,
+            'context': context,
+            'company': self.env.company.id,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @api.model
+    def _get_stale_limit(self):
+        """ Jobs processing since before this date are considered dead, e.g. their
+        worker was killed by limit_time_real while rendering """
+        timeout = int(self.env['ir.config_parameter'].sudo().get_param(
+            'accounting_pdf_reports.report_job_timeout_minutes', 30))
+        return fields.Datetime.now() - timedelta(minutes=timeout)
+
+    @api.model
+    def _enqueue_report_action(self, action):
+        """ Queue the rendering of a report action as returned by report_action,
+        or return the job already answering the same request. A finished job is
+        reused for report_job_cache_minutes, so it does not include the entries
+        posted since it was generated. The action context must hold the
+        active_model, active_id and active_ids the reports expect, which the
+        web client adds when it runs the action itself. """
+        report = self.env['ir.actions.report']._get_report(action['report_name'])
+        action_context = action.get('context') or {}
+        res_ids = action_context.get('active_ids') or []
+        active_model = action_context.get('active_model')
+        context = {key: action_context[key] for key in ('lang', 'landscape')
+                   if key in action_context}
+        data = action.get('data') or {}
+        data_hash = self._get_data_hash(report, res_ids, data, dict(context, active_model=active_model))
+        cache_minutes = int(self.env['ir.config_parameter'].sudo().get_param(
+            'accounting_pdf_reports.report_job_cache_minutes', 60))
+        job = self.search([
+            ('data_hash', '=', data_hash),
+            ('user_id', '=', self.env.user.id),
+            '|', '|', ('state', '=', 'queued'),
+            '&', ('state', '=', 'processing'), ('date_start', '>=', self._get_stale_limit()),
+            '&', ('state', '=', 'done'),
+            ('date_done', '>=', fields.Datetime.now() - timedelta(minutes=cache_minutes)),
+        ], limit=1)
+        if job:
+            return job
+        job = self.create({
+            'name': report.name,
+            'report_id': report.id,
+            'res_ids': json.dumps(res_ids),
+            'active_model': active_model,
+            'active_id': action_context.get('active_id'),
+            'data': json.dumps(data, default=str),
+            'report_context': json.dumps(context),
+            'data_hash': data_hash,
+        })
+        self.env.ref('accounting_pdf_reports.ir_cron_account_report_job')._trigger()
+        return job
+
+    def _render(self):
+        self.ensure_one()
+        report = self.report_id.with_user(self.user_id).with_company(self.company_id).with_context(
+            json.loads(self.report_context or '{}'),
+            active_model=self.active_model,
+            active_id=self.active_id,
+            active_ids=json.loads(self.res_ids or '[]'),
+            discard_logo_check=True)
+        data = json.loads(self.data or '{}')
+        # like the report controller, the records are only given without data
+        res_ids = None if data else json.loads(self.res_ids or '[]')
+        content, report_type = report._render_qweb_pdf(report.report_name, res_ids=res_ids, data=data)
+        return self.env['ir.attachment'].create({
+            'name': '%s.%s' % (self.name, report_type),
+            'datas': base64.b64encode(content),
+            'res_model': self._name,
+            'res_id': self.id,
+            'mimetype': 'application/pdf',
+        })
+
+    @api.model
+    def _fail_stale_jobs(self):
+        """ Fail the jobs whose rendering never finished, so their users can request
+        them again. They are not requeued: the report would likely kill the worker again. """
+        jobs = self.search([
+            ('state', '=', 'processing'),
+            '|', ('date_start', '=', False), ('date_start', '<', self._get_stale_limit()),
+        ])
+        for job in jobs:
+            job.write({'state': 'failed', 'error': _('The report generation did not finish in time.')})
+            job.message_notify(
+                partner_ids=job.user_id.partner_id.ids,
+                subject=_('%s failed', job.name),
+                body=_('The report %s you requested could not be generated.', job.name),
+            )
+
+    @api.model
+    def _cron_process_jobs(self, limit=10):
+        """ Render the queued reports, one transaction per report """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self._fail_stale_jobs()
+        if auto_commit:
+            self.env.cr.commit()
+        for job in self.search([('state', '=', 'queued')], order='id', limit=limit):
+            job.write({'state': 'processing', 'date_start': fields.Datetime.now()})
+            if auto_commit:
+                self.env.cr.commit()
+            try:
+                attachment = job._render()
+                job.write({
+                    'state': 'done',
+                    'attachment_id': attachment.id,
+                    'date_done': fields.Datetime.now(),
+                    'error': False,
+                })
+                job.message_notify(
+                    partner_ids=job.user_id.partner_id.ids,
+                    subject=_('%s is ready', job.name),
+                    body=_('The report %s you requested is ready.', job.name),
+                    attachment_ids=attachment.ids,
+                )
+            except Exception as e:
+                if not auto_commit:
+                    raise
+                self.env.cr.rollback()
+                _logger.exception('Background rendering of report %s failed', job.name)
+                job.write({'state': 'failed', 'error': str(e)})
+                job.message_notify(
+                    partner_ids=job.user_id.partner_id.ids,
+                    subject=_('%s failed', job.name),
+                    body=_('The report %s you requested could not be generated.', job.name),
+                )
+            if auto_commit:
+                self.env.cr.commit()
+        if self.search_count([('state', '=', 'queued')]):
+            self.env.ref('accounting_pdf_reports.ir_cron_account_report_job')._trigger()
+
+    def action_download(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/web/content/%s?download=true' % self.attachment_id.id,
+            'target': 'self',
+        }
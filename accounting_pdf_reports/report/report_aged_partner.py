@@ -266,3 +266,14 @@ class ReportAgedPartnerBalance(models.AbstractModel):
             'get_partner_lines': movelines,
             'get_direction': total,
         }
+
+    def _get_export_rows(self, docids, data):
+        """ Rows of the report for the tabular exports, the first one being the header """
+        values = self._get_report_values(docids, data)
+        form = values['data']
+        total = values['get_direction']
+        yield [_('Partners'), _('Not due')] + [form[str(i)]['name'] for i in range(5)[::-1]] + [_('Total')]
+        yield [_('Account Total'), total[6], total[4], total[3], total[2], total[1], total[0], total[5]]
+        for partner in values['get_partner_lines']:
+            yield [partner['name'], partner['direction'], partner['4'], partner['3'],
+                   partner['2'], partner['1'], partner['0'], partner['total']]
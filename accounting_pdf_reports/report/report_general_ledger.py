@@ -95,7 +95,7 @@ class ReportGeneralLedger(models.AbstractModel):
             l.amount_currency, '' AS analytic_account_id,
             l.ref AS lref, l.name AS lname, COALESCE(l.debit,0) AS debit, 
             COALESCE(l.credit,0) AS credit, 
-            COALESCE(SUM(l.debit),0) - COALESCE(SUM(l.credit), 0) AS balance,\
+            COALESCE(l.debit,0) - COALESCE(l.credit,0) AS balance,\
             m.name AS move_name, c.symbol AS currency_code, 
             p.name AS partner_name\
             FROM account_move_line l\
@@ -104,18 +104,20 @@ class ReportGeneralLedger(models.AbstractModel):
             LEFT JOIN res_partner p ON (l.partner_id=p.id)\
             JOIN account_journal j ON (l.journal_id=j.id)\
             JOIN account_account acc ON (l.account_id = acc.id) \
-            WHERE l.account_id IN %s ''' + filters + ''' GROUP BY l.id, 
-            l.account_id, l.date, j.code, l.currency_id, l.amount_currency, 
-            l.ref, l.name, m.name, c.symbol, p.name ORDER BY ''' + sql_sort)
+            WHERE l.account_id IN %s ''' + filters + ''' ORDER BY ''' + sql_sort)
         params = (tuple(accounts.ids),) + tuple(where_params)
         cr.execute(sql, params)
 
+        # Carry the running balance of every account, starting from its initial balance
+        balances = {
+            account_id: sum(line['debit'] - line['credit'] for line in lines)
+            for account_id, lines in move_lines.items()
+        }
         for row in cr.dictfetchall():
-            balance = 0
-            for line in move_lines.get(row['account_id']):
-                balance += line['debit'] - line['credit']
-            row['balance'] += balance
-            move_lines[row.pop('account_id')].append(row)
+            account_id = row.pop('account_id')
+            balances[account_id] += row['balance']
+            row['balance'] = balances[account_id]
+            move_lines[account_id].append(row)
 
         # Calculate the debit, credit and balance for Accounts
         account_res = []
@@ -184,3 +186,17 @@ class ReportGeneralLedger(models.AbstractModel):
             'partner_ids': partner_ids,
             'analytic_account_ids': analytic_account_ids,
         }
+
+    def _get_export_rows(self, docids, data):
+        """ Rows of the report for the tabular exports, the first one being the header """
+        values = self._get_report_values(docids, data)
+        yield [_('Account'), _('Date'), _('JRNL'), _('Partner'), _('Ref'), _('Move'),
+               _('Entry Label'), _('Debit'), _('Credit'), _('Balance'), _('Amount Currency'), _('Currency')]
+        for account in values['Accounts']:
+            yield ['%s %s' % (account['code'], account['name']), '', '', '', '', '', '',
+                   account['debit'], account['credit'], account['balance'], '', '']
+            for line in account['move_lines']:
+                yield [account['code'], line['ldate'], line['lcode'], line['partner_name'] or '',
+                       line['lref'] or '', line['move_name'], line['lname'] or '',
+                       line['debit'], line['credit'], line['balance'],
+                       line['amount_currency'] or '', line['currency_code'] or '']
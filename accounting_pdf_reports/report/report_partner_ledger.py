@@ -122,3 +122,21 @@ class ReportPartnerLedger(models.AbstractModel):
             'lines': self._lines,
             'sum_partner': self._sum_partner,
         }
+
+    def _get_export_rows(self, docids, data):
+        """ Rows of the report for the tabular exports, the first one being the header;
+        the lines of every partner are only fetched when they are written """
+        values = self._get_report_values(docids, data)
+        data = values['data']
+        yield [_('Partner'), _('Date'), _('JRNL'), _('Account'), _('Ref'),
+               _('Debit'), _('Credit'), _('Balance'), _('Amount Currency'), _('Currency')]
+        for partner in values['docs']:
+            partner_name = '%s%s' % (partner.ref and '%s - ' % partner.ref or '', partner.name or '')
+            yield [partner_name, '', '', '', '',
+                   self._sum_partner(data, partner, 'debit'),
+                   self._sum_partner(data, partner, 'credit'),
+                   self._sum_partner(data, partner, 'debit - credit'), '', '']
+            for line in self._lines(data, partner):
+                yield [partner_name, line['date'], line['code'], line['a_code'], line['displayed_name'],
+                       line['debit'], line['credit'], line['progress'],
+                       line['amount_currency'] or '', line['currency_code'] or '']
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
-from odoo import api, models, _
+from dateutil.relativedelta import relativedelta
+from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 
 
@@ -14,59 +15,90 @@ class ReportTax(models.AbstractModel):
             raise UserError(_("Form content is missing, this report cannot be printed."))
         return {
             'data': data['form'],
+            'periods': self._get_periods(data.get('form')),
             'lines': self.get_lines(data.get('form')),
         }
 
-    def _sql_from_amls_one(self):
-        sql = """SELECT "account_move_line".tax_line_id, COALESCE(SUM("account_move_line".debit-"account_move_line".credit), 0)
-                    FROM %s
-                    WHERE %s GROUP BY "account_move_line".tax_line_id"""
-        return sql
-
-    def _sql_from_amls_two(self):
-        sql = """SELECT r.account_tax_id, COALESCE(SUM("account_move_line".debit-"account_move_line".credit), 0)
+    def _sql_from_amls_periods(self, periods):
+        """ Net and tax amounts of every tax, for every period, in a single scan of the
+        move lines: the tax lines count for the tax amount of their tax_line_id and
+        every line counts for the net amount of each of its tax_ids """
+        columns = ', '.join(
+            """COALESCE(SUM("account_move_line".debit-"account_move_line".credit)
+                FILTER (WHERE "account_move_line".date BETWEEN %%s AND %%s), 0)"""
+            for period in periods)
+        sql = """SELECT t.tax_id, t.kind, """ + columns + """
                  FROM %s
-                 INNER JOIN account_move_line_account_tax_rel r ON ("account_move_line".id = r.account_move_line_id)
-                 INNER JOIN account_tax t ON (r.account_tax_id = t.id)
-                 WHERE %s GROUP BY r.account_tax_id"""
+                 CROSS JOIN LATERAL (
+                     SELECT "account_move_line".tax_line_id AS tax_id, 'tax' AS kind
+                     WHERE "account_move_line".tax_line_id IS NOT NULL
+                     UNION ALL
+                     SELECT r.account_tax_id, 'net'
+                     FROM account_move_line_account_tax_rel r
+                     WHERE r.account_move_line_id = "account_move_line".id
+                 ) t
+                 WHERE %s GROUP BY t.tax_id, t.kind"""
         return sql
 
-    def _compute_from_amls(self, options, taxes):
-        #compute the tax amount
-        sql = self._sql_from_amls_one()
+    def _compute_periods_from_amls(self, periods, taxes):
+        """ Fill the signed 'periods' amounts of taxes, the move lines being already
+        filtered on the whole range of periods by the context """
+        sql = self._sql_from_amls_periods(periods)
         tables, where_clause, where_params = self.env['account.move.line']._query_get()
         query = sql % (tables, where_clause)
-        self.env.cr.execute(query, where_params)
-        results = self.env.cr.fetchall()
-        for result in results:
-            if result[0] in taxes:
-                taxes[result[0]]['tax'] = abs(result[1])
+        period_params = [date for period in periods for date in (period['date_from'], period['date_to'])]
+        self.env.cr.execute(query, period_params + where_params)
+        for tax_id, kind, *amounts in self.env.cr.fetchall():
+            if tax_id in taxes:
+                for period, amount in zip(taxes[tax_id]['periods'], amounts):
+                    period[kind] = amount
 
-        #compute the net amount
-        sql2 = self._sql_from_amls_two()
-        query = sql2 % (tables, where_clause)
-        self.env.cr.execute(query, where_params)
-        results = self.env.cr.fetchall()
-        for result in results:
-            if result[0] in taxes:
-                taxes[result[0]]['net'] = abs(result[1])
+    @api.model
+    def _get_periods(self, options):
+        """ Split the date range of the report in periods, one per month if requested """
+        date_from = fields.Date.to_date(options['date_from'])
+        date_to = fields.Date.to_date(options['date_to'])
+        if options.get('period_split') != 'month':
+            return [{'name': '', 'date_from': date_from, 'date_to': date_to}]
+        periods = []
+        period_start = date_from
+        while period_start <= date_to:
+            period_stop = min(period_start + relativedelta(day=31), date_to)
+            periods.append({
+                'name': period_start.strftime('%m/%Y'),
+                'date_from': period_start,
+                'date_to': period_stop,
+            })
+            period_start = period_stop + relativedelta(days=1)
+        return periods
 
     @api.model
     def get_lines(self, options):
+        periods = self._get_periods(options)
         taxes = {}
         for tax in self.env['account.tax'].search([('type_tax_use', '!=', 'none')]):
             if tax.children_tax_ids:
                 for child in tax.children_tax_ids:
                     if child.type_tax_use != 'none':
                         continue
-                    taxes[child.id] = {'tax': 0, 'net': 0, 'name': child.name, 'type': tax.type_tax_use}
+                    taxes[child.id] = {'name': child.name, 'type': tax.type_tax_use}
             else:
-                taxes[tax.id] = {'tax': 0, 'net': 0, 'name': tax.name, 'type': tax.type_tax_use}
+                taxes[tax.id] = {'name': tax.name, 'type': tax.type_tax_use}
+        for tax in taxes.values():
+            tax['periods'] = [{'tax': 0, 'net': 0} for period in periods]
         self.with_context(date_from=options['date_from'], date_to=options['date_to'],
                           state=options['target_move'],
-                          strict_range=True)._compute_from_amls(options, taxes)
+                          strict_range=True)._compute_periods_from_amls(periods, taxes)
         groups = dict((tp, []) for tp in ['sale', 'purchase'])
         for tax in taxes.values():
+            for kind in ('tax', 'net'):
+                # the total is printed in absolute value, the periods with the same sign
+                # so they add up to it, e.g. a month where refunds outweigh sales is negative
+                total = sum(period[kind] for period in tax['periods'])
+                sign = -1 if total < 0 else 1
+                tax[kind] = sign * total
+                for period in tax['periods']:
+                    period[kind] = sign * period[kind]
             if tax['tax']:
                 groups[tax['type']].append(tax)
         return groups
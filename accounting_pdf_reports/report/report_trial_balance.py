@@ -123,3 +123,11 @@ class ReportTrialBalance(models.AbstractModel):
             'time': time,
             'Accounts': account_res,
         }
+
+    def _get_export_rows(self, docids, data):
+        """ Rows of the report for the tabular exports, the first one being the header """
+        values = self._get_report_values(docids, data)
+        yield [_('Code'), _('Account'), _('Initial Balance'), _('Debit'), _('Credit'), _('Balance')]
+        for account in values['Accounts']:
+            yield [account['code'], account['name'], account['initial_balance'],
+                   account['debit'], account['credit'], account['balance']]
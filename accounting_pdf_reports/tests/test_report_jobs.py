@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestReportJobs(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        invoice = cls.init_invoice('out_invoice', products=cls.product_a, post=True)
+        cls.date_from = fields.Date.start_of(invoice.date, 'year')
+        cls.date_to = fields.Date.end_of(invoice.date, 'year')
+        cls.financial_report = cls.env['account.financial.report'].create({'name': 'Balance Sheet'})
+
+    def _create_wizards(self):
+        journals = self.env['account.journal'].search([('company_id', '=', self.env.company.id)])
+        dates = {'date_from': self.date_from, 'date_to': self.date_to}
+        return {
+            'general_ledger': self.env['account.report.general.ledger'].create(dict(dates, journal_ids=journals.ids)),
+            'partner_ledger': self.env['account.report.partner.ledger'].create(dict(dates, journal_ids=journals.ids)),
+            'trial_balance': self.env['account.balance.report'].create(dict(dates, journal_ids=journals.ids)),
+            'aged_balance': self.env['account.aged.trial.balance'].create({
+                'date_from': self.date_to,
+                'journal_ids': journals.ids,
+            }),
+            'financial': self.env['accounting.report'].create(dict(dates, account_report_id=self.financial_report.id)),
+            'tax': self.env['account.tax.report.wizard'].create(dates),
+            'journal_audit': self.env['account.print.journal'].create(dict(dates, journal_ids=journals.ids)),
+        }
+
+    def test_background_reports(self):
+        """ The jobs queued from the wizards are rendered by the cron, without the
+        active record the web client adds when it prints a report itself """
+        Job = self.env['account.report.job']
+        for name, wizard in self._create_wizards().items():
+            with self.subTest(report=name):
+                wizard.check_report_background()
+                job = Job.search([('active_model', '=', wizard._name)], limit=1)
+                self.assertEqual(job.active_id, wizard.id)
+                self.assertEqual(job.state, 'queued')
+                Job._cron_process_jobs()
+                self.assertEqual(job.state, 'done', job.error)
+                self.assertTrue(job.attachment_id)
+
+    def test_exports(self):
+        wizards = self._create_wizards()
+        for name in ('general_ledger', 'partner_ledger', 'trial_balance', 'aged_balance'):
+            for export_format in ('csv', 'xlsx'):
+                with self.subTest(report=name, export_format=export_format):
+                    action = wizards[name].with_context(export_format=export_format).check_report_export()
+                    attachment = self.env['ir.attachment'].browse(
+                        int(action['url'].split('/web/content/')[1].split('?')[0]))
+                    self.assertTrue(attachment.name.endswith('.%s' % export_format))
+                    self.assertTrue(attachment.raw)
@@ -1,8 +1,21 @@
 # -*- coding: utf-8 -*-
 
+import csv
+import io
+import json
+import tempfile
+from datetime import timedelta
+
+import xlsxwriter
+
 from odoo import api, fields, models, _
+from odoo.exceptions import UserError
 from odoo.tools.misc import get_lang
 
+# marks the exported files, which are not linked to the wizard that is vacuumed
+EXPORT_ATTACHMENT_DESCRIPTION = 'accounting_pdf_reports.export'
+XLSX_MAX_ROWS = 1048576
+
 
 class AccountCommonReport(models.TransientModel):
     _name = "account.common.report"
@@ -52,3 +65,96 @@ class AccountCommonReport(models.TransientModel):
         used_context = self._build_contexts(data)
         data['form']['used_context'] = dict(used_context, lang=get_lang(self.env).code)
         return self.with_context(discard_logo_check=True)._print_report(data)
+
+    def _get_report_action_context(self, action):
+        """ Context of the report action with the active record set to the wizard,
+        as the web client does when it runs the action returned by check_report """
+        return dict(action.get('context') or {}, active_model=self._name, active_id=self.id, active_ids=[self.id])
+
+    def check_report_background(self):
+        """ Queue the report instead of rendering it in the request; the user is
+        notified with the file once a cron worker has generated it """
+        action = self.check_report()
+        if not isinstance(action, dict) or action.get('type') != 'ir.actions.report':
+            return action
+        action = dict(action, context=self._get_report_action_context(action))
+        job = self.env['account.report.job']._enqueue_report_action(action)
+        if job.state == 'done':
+            return job.action_download()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'info',
+                'message': _("%s is being generated, you will be notified when it is ready.", job.name),
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+    def check_report_export(self):
+        """ Export the report as XLSX or CSV (export_format in the context) from
+        the data methods of its report model, without rendering any HTML or PDF """
+        self.ensure_one()
+        file_format = self.env.context.get('export_format') or 'xlsx'
+        action = self.check_report()
+        report = self.env['ir.actions.report']._get_report(action['report_name'])
+        report_model = self.env['report.%s' % report.report_name]
+        if not hasattr(report_model, '_get_export_rows'):
+            raise UserError(_("The report %s can only be printed as PDF.", report.name))
+        action_context = self._get_report_action_context(action)
+        # same data as the one the report receives when printed from the client
+        data = json.loads(json.dumps(action.get('data') or {}, default=str))
+        rows = report_model.with_context(action_context)._get_export_rows(
+            action_context.get('active_ids'), data)
+        with tempfile.TemporaryFile() as export_file:
+            if file_format == 'csv':
+                self._write_csv_export(export_file, rows)
+            else:
+                self._write_xlsx_export(export_file, rows, report.name)
+            export_file.seek(0)
+            attachment = self.env['ir.attachment'].create({
+                'name': '%s.%s' % (report.name, file_format),
+                'raw': export_file.read(),
+                'description': EXPORT_ATTACHMENT_DESCRIPTION,
+            })
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/web/content/%s?download=true' % attachment.id,
+            'target': 'self',
+        }
+
+    @api.autovacuum
+    def _gc_report_exports(self):
+        """ Delete the exported files after a day """
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', False),
+            ('description', '=', EXPORT_ATTACHMENT_DESCRIPTION),
+            ('create_date', '<', fields.Datetime.now() - timedelta(days=1)),
+        ]).unlink()
+
+    def _write_csv_export(self, export_file, rows):
+        wrapper = io.TextIOWrapper(export_file, encoding='utf-8', newline='')
+        writer = csv.writer(wrapper)
+        for row in rows:
+            writer.writerow(row)
+        wrapper.flush()
+        wrapper.detach()
+
+    def _write_xlsx_export(self, export_file, rows, sheet_name):
+        # constant_memory: every row is flushed to disk once the next one is written
+        workbook = xlsxwriter.Workbook(export_file, {
+            'constant_memory': True,
+            'default_date_format': 'yyyy-mm-dd',
+        })
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        header_format = workbook.add_format({'bold': True})
+        for row_index, row in enumerate(rows):
+            if row_index >= XLSX_MAX_ROWS:
+                # xlsxwriter silently ignores the cells past the last row of a sheet
+                raise UserError(_("The report has more lines than a XLSX sheet can hold, export it as CSV."))
+            cell_format = header_format if not row_index else None
+            for col_index, value in enumerate(row):
+                if value is None or value is False:
+                    value = ''
+                worksheet.write(row_index, col_index, value, cell_format)
+        workbook.close()
@@ -13,6 +13,11 @@ class AccountTaxReport(models.TransientModel):
                             default=lambda self: fields.Date.to_string(date.today().replace(day=1)))
     date_to = fields.Date(string='Date To', required=True,
                           default=lambda self: fields.Date.to_string(date.today()))
+    period_split = fields.Selection([('none', 'Whole Period'),
+                                     ('month', 'Monthly'),
+                                     ], string='Periods', required=True, default='none',
+                                    help="Report the amounts of every month of the date range in its own column.")
 
     def _print_report(self, data):
+        data['form'].update(self.read(['period_split'])[0])
         return self.env.ref('accounting_pdf_reports.action_report_account_tax').report_action(self, data=data)
@@ -18,6 +18,7 @@
     'data': [
         'data/system_parameters.xml',
         'views/mrp_production_views.xml',
+        'views/product_template_views.xml',
     ],
     'installable': True,
     'application': False,
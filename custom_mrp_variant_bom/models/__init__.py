@@ -3,3 +3,6 @@
 from . import sale_order_line
 from . import stock_rule
 from . import mrp_production
+from . import mrp_bom
+from . import product_product
+from . import product_template
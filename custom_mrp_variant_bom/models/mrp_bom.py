@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, models, tools
+
+
+class MrpBom(models.Model):
+    _inherit = "mrp.bom"
+
+    @api.model
+    @tools.ormcache('product_id', 'company_id')
+    def _get_variant_bom_id(self, product_id, company_id):
+        """
+        Cached (variant, company) -> BOM id resolution used by procurements.
+        The cache is cleared whenever a BOM is created, modified or deleted.
+        """
+        return self.sudo().search([
+            ('product_id', '=', product_id),
+            ('company_id', '=', company_id),
+        ], limit=1).id
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        boms = super(MrpBom, self).create(vals_list)
+        self.clear_caches()
+        return boms
+
+    def write(self, vals):
+        result = super(MrpBom, self).write(vals)
+        if {'product_id', 'company_id', 'active'} & set(vals):
+            self.clear_caches()
+        return result
+
+    def unlink(self):
+        result = super(MrpBom, self).unlink()
+        self.clear_caches()
+        return result
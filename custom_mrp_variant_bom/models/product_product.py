@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, models
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class ProductProduct(models.Model):
+    _inherit = "product.product"
+
+    @api.model
+    def _get_bobina_product(self):
+        """
+        Get product bobina - search by default_code from system parameter,
+        falling back to a product named "BOBINA ALUZINC"
+        """
+        bobina_code = self.env['ir.config_parameter'].sudo().get_param(
+            'custom_mrp_variant_bom.bobina_product_code',
+            'BAN01'  # Default fallback
+        )
+        bobina_product = self.search([('default_code', '=', bobina_code)], limit=1)
+
+        # If not found, try to find by name containing "BOBINA"
+        if not bobina_product:
+            bobina_product = self.search([('name', 'ilike', 'BOBINA ALUZINC')], limit=1)
+
+        if not bobina_product:
+            _logger.error('ERROR: Product bobina (%s or BOBINA ALUZINC) does not exist', bobina_code)
+        return bobina_product
+
+    def _provision_variant_boms(self, company):
+        """
+        Make sure every special variant in self has a BOM for the given company,
+        with product bobina as component (quantity = variant measurement value).
+        Existing BOMs are looked up with one search and the missing ones are
+        created with one multi-create.
+
+        :return: dict mapping variant id to its mrp.bom record
+        """
+        variants = self.filtered('is_special')
+        company_id = company.id if company else False
+        boms = self.env['mrp.bom'].search([
+            ('product_id', 'in', variants.ids),
+            ('company_id', '=', company_id),
+        ])
+        bom_by_variant = {}
+        for bom in boms:
+            bom_by_variant.setdefault(bom.product_id.id, bom)
+
+        missing_variants = variants.filtered(lambda v: v.id not in bom_by_variant)
+        if not missing_variants:
+            return bom_by_variant
+
+        bobina_product = self._get_bobina_product()
+        if not bobina_product:
+            return bom_by_variant
+
+        vals_list = [{
+            'product_id': variant.id,
+            'product_tmpl_id': variant.product_tmpl_id.id,
+            'product_qty': 1.0,  # 1 unit of the variant
+            'product_uom_id': variant.uom_id.id,
+            'type': 'normal',
+            'company_id': company_id,
+            'bom_line_ids': [(0, 0, {
+                'product_id': bobina_product.id,
+                # Quantity = variant numeric value (e.g., 3.1 pies)
+                'product_qty': variant.measurement_value,
+                'product_uom_id': bobina_product.uom_id.id,
+            })],
+        } for variant in missing_variants]
+        new_boms = self.env['mrp.bom'].create(vals_list)
+        for bom in new_boms:
+            bom_by_variant[bom.product_id.id] = bom
+
+        _logger.info(
+            'Created %s variant BOMs with bobina %s (ID: %s) for company %s',
+            len(new_boms), bobina_product.display_name, bobina_product.id, company_id
+        )
+        return bom_by_variant
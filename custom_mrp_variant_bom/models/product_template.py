@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import _, models
+
+
+class ProductTemplate(models.Model):
+    _inherit = "product.template"
+
+    def action_provision_variant_boms(self):
+        """
+        Create the missing BOMs of all special variants of the templates for the
+        current company, so procurements find them instead of creating them inline
+        """
+        variants = self.filtered('is_special').product_variant_ids
+        bom_by_variant = variants._provision_variant_boms(self.env.company)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Listas de materiales de variantes'),
+                'message': _('%s de %s variantes tienen lista de materiales.')
+                % (len(bom_by_variant), len(variants)),
+                'type': 'success' if len(bom_by_variant) == len(variants) else 'warning',
+                'sticky': False,
+            },
+        }
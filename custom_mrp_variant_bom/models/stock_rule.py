@@ -73,21 +73,22 @@ class StockRule(models.Model):
                 )
                 
                 if variant.is_special:
-                    # Find existing BOM for this variant
-                    variant_bom = self.env['mrp.bom'].search([
-                        ('product_id', '=', variant_id),
-                        ('company_id', '=', company_id.id if company_id else False)
-                    ], limit=1)
+                    # Find existing BOM for this variant (cached per company)
+                    variant_bom_id = self.env['mrp.bom']._get_variant_bom_id(
+                        variant.id, company_id.id if company_id else False
+                    )
                     
-                    if variant_bom:
+                    if variant_bom_id:
                         _logger.info(
-                            'Found existing BOM %s (ID: %s) for variant %s',
-                            variant_bom.display_name, variant_bom.id, variant.display_name
+                            'Found existing BOM (ID: %s) for variant %s',
+                            variant_bom_id, variant.display_name
                         )
-                        mo_vals['bom_id'] = variant_bom.id
+                        mo_vals['bom_id'] = variant_bom_id
                     else:
-                        # Create new BOM for this variant with configured component
-                        _logger.info(
+                        # Create new BOM for this variant with configured component.
+                        # BOMs should be provisioned beforehand from the template
+                        # (action_provision_variant_boms), this is only a safety net.
+                        _logger.warning(
                             'No BOM found for variant %s (ID: %s). Creating new BOM. Company ID: %s',
                             variant.display_name, variant.id, company_id.id if company_id else False
                         )
@@ -115,82 +116,11 @@ class StockRule(models.Model):
         """
         try:
             _logger.info('_create_variant_bom called for variant %s (ID: %s)', variant.display_name, variant.id)
-            
-            # Get variant numeric value (e.g., 3.1 from "Aluzinc (3.1')")
-            variant_numeric_value = variant._get_variant_numeric_value()
-            _logger.info('Variant numeric value: %s', variant_numeric_value)
-            
-            # Get product bobina - search by default_code from system parameter
-            bobina_code = self.env['ir.config_parameter'].sudo().get_param(
-                'custom_mrp_variant_bom.bobina_product_code', 
-                'BAN01'  # Default fallback
-            )
-            bobina_product = self.env['product.product'].search([
-                ('default_code', '=', bobina_code)
-            ], limit=1)
-            
-            # If not found, try to find by name containing "BOBINA"
-            if not bobina_product:
-                bobina_product = self.env['product.product'].search([
-                    ('name', 'ilike', 'BOBINA ALUZINC')
-                ], limit=1)
-            
-            if not bobina_product:
-                _logger.error('ERROR: Product bobina (%s or BOBINA ALUZINC) does not exist', bobina_code)
-                # Log all products with BOBINA in name for debugging
-                all_bobinas = self.env['product.product'].search([('name', 'ilike', 'BOBINA')])
-                _logger.error('Found products with BOBINA in name: %s', 
-                             [(p.id, p.default_code, p.name) for p in all_bobinas[:10]])
-                return False
-            
-            _logger.info('Found bobina product: %s (ID: %s, Code: %s)', 
-                        bobina_product.display_name, bobina_product.id, bobina_product.default_code)
-            
-            # Get UOM for bobina (usually pie/feet)
-            bobina_uom = bobina_product.uom_id
-            _logger.info('Bobina UOM: %s (ID: %s)', bobina_uom.name, bobina_uom.id)
-            
-            # Create BOM line with bobina
-            bom_lines = [(0, 0, {
-                'product_id': bobina_product.id,
-                'product_qty': variant_numeric_value,  # Quantity = variant numeric value (e.g., 3.1 pies)
-                'product_uom_id': bobina_uom.id,
-            })]
-            
-            _logger.info('Prepared BOM line: product_id=%s, qty=%s, uom_id=%s', 
-                        bobina_product.id, variant_numeric_value, bobina_uom.id)
-            
-            # Get product UOM (usually Plancha)
-            product_uom = variant.uom_id
-            _logger.info('Variant UOM: %s (ID: %s)', product_uom.name, product_uom.id)
-            
-            # Create the variant BOM
-            bom_vals = {
-                'product_id': variant.id,
-                'product_tmpl_id': variant.product_tmpl_id.id,
-                'product_qty': 1.0,  # 1 unit of the variant
-                'product_uom_id': product_uom.id,
-                'type': 'normal',
-                'company_id': company_id.id if company_id else False,
-                'bom_line_ids': bom_lines,
-            }
-            
-            _logger.info('Creating BOM with values: %s', bom_vals)
-            
-            variant_bom = self.env['mrp.bom'].create(bom_vals)
-            
-            _logger.info(
-                'Created BOM for variant %s with bobina (ID: 941). Quantity: %s %s',
-                variant.display_name, variant_numeric_value, bobina_uom.name
-            )
-            
-            return variant_bom
-            
+            bom_by_variant = variant._provision_variant_boms(company_id)
+            return bom_by_variant.get(variant.id, False)
         except Exception as e:
             _logger.error(
                 'ERROR: Exception creating BOM for variant %s: %s',
-                variant.display_name, str(e)
+                variant.display_name, str(e), exc_info=True
             )
-            import traceback
-            _logger.error(traceback.format_exc())
             return False
@@ -1,12 +1,23 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from collections import defaultdict
+
 from odoo import models, fields, api
+from odoo.tools import float_compare
 import logging
 import re
 
 _logger = logging.getLogger(__name__)
 
+NUMERIC_VALUE_RE = re.compile(r'\d+\.?\d*')
+
+
+def _extract_numeric_value(text):
+    """Return the first number found in text (e.g. 3.1 from "3.1'") or None"""
+    match = NUMERIC_VALUE_RE.search(text or '')
+    return float(match.group()) if match else None
+
 
 class ProductProduct(models.Model):
     _inherit = 'product.product'
@@ -27,64 +38,64 @@ class ProductProduct(models.Model):
         store=False
     )
 
-    def _get_variant_numeric_value(self):
+    measurement_value = fields.Float(
+        string='Valor de medida',
+        compute='_compute_measurement_value',
+        store=True,
+        index=True,
+        help='Valor numérico de la variante (p. ej. 3.1 para "Aluzinc (3.1\')"), '
+             'usado para calcular precios especiales y listas de materiales'
+    )
+
+    @api.depends(
+        'product_template_attribute_value_ids.name',
+        'default_code',
+        'product_tmpl_id.name',
+        'product_tmpl_id.product_variant_ids',
+    )
+    def _compute_measurement_value(self):
         """
         Get the numeric value of the variant.
         Searches for a numeric value in the attribute values or display_name.
         If not found, uses the variant index (1, 2, 3, etc.)
         """
+        variant_indexes = {}
+        for variant in self:
+            # Search for numeric values in the variant attributes
+            # (e.g., "1", "2", "3.1'", "Size 3", etc.)
+            for attr_value in variant.product_template_attribute_value_ids:
+                numeric_val = _extract_numeric_value(attr_value.name)
+                if numeric_val is not None:
+                    break
+            else:
+                # If not found in attributes, try to extract from display_name
+                # Example: "Aluzinc (3.1')" -> extract 3.1
+                numeric_val = _extract_numeric_value(variant.display_name)
+
+            if numeric_val is None:
+                # If no numeric value is found in attributes or display_name,
+                # use the variant index (position in the list of variants sorted by ID)
+                template = variant.product_tmpl_id
+                if template.id not in variant_indexes:
+                    variant_indexes[template.id] = {
+                        variant_id: float(index)
+                        for index, variant_id in enumerate(sorted(template.product_variant_ids.ids), 1)
+                    }
+                numeric_val = variant_indexes[template.id].get(variant.id)
+
+            if numeric_val is None:
+                _logger.warning(
+                    'Could not determine index for variant %s (ID: %s), using 1.0',
+                    variant.display_name, variant.id
+                )
+                numeric_val = 1.0
+
+            variant.measurement_value = numeric_val
+
+    def _get_variant_numeric_value(self):
+        """Return the stored numeric value of the variant, see measurement_value"""
         self.ensure_one()
-        
-        # Search for numeric values in the variant attributes
-        if self.product_template_attribute_value_ids:
-            for attr_value in self.product_template_attribute_value_ids:
-                # Try to extract a number from the attribute value name
-                name = attr_value.name or ''
-                # Search for numbers in the name (e.g., "1", "2", "3.1'", "Size 3", etc.)
-                # Improved regex to capture decimal numbers: matches "3.1" from "3.1'"
-                numbers = re.findall(r'\d+\.?\d*', name)
-                if numbers:
-                    try:
-                        numeric_val = float(numbers[0])
-                        _logger.info(
-                            'Numeric value found in attribute for variant %s (ID: %s): %s (from "%s")',
-                            self.display_name, self.id, numeric_val, name
-                        )
-                        return numeric_val
-                    except ValueError:
-                        continue
-        
-        # If not found in attributes, try to extract from display_name
-        # Example: "Aluzinc (3.1')" -> extract 3.1
-        if self.display_name:
-            numbers = re.findall(r'\d+\.?\d*', self.display_name)
-            if numbers:
-                try:
-                    numeric_val = float(numbers[0])
-                    _logger.info(
-                        'Numeric value found in display_name for variant %s (ID: %s): %s (from "%s")',
-                        self.display_name, self.id, numeric_val, self.display_name
-                    )
-                    return numeric_val
-                except ValueError:
-                    pass
-        
-        # If no numeric value is found in attributes or display_name,
-        # use the variant index (position in the list of variants sorted by ID)
-        variants = self.product_tmpl_id.product_variant_ids.sorted('id')
-        try:
-            variant_index = list(variants.ids).index(self.id) + 1
-            _logger.info(
-                'Using variant index for %s (ID: %s): %s',
-                self.display_name, self.id, variant_index
-            )
-            return float(variant_index)
-        except (ValueError, IndexError):
-            _logger.warning(
-                'Could not determine index for variant %s (ID: %s), using 1.0',
-                self.display_name, self.id
-            )
-            return 1.0
+        return self.measurement_value
 
     @api.model
     def create(self, vals):
@@ -102,97 +113,70 @@ class ProductProduct(models.Model):
         # Note: price_per_measurement is related, so it's recalculated from template
         fields_to_check = ['is_special', 'product_template_attribute_value_ids']
         if any(field in vals for field in fields_to_check):
-            for variant in self:
-                if variant.is_special and variant.price_per_measurement:
-                    variant._compute_special_price()
+            self._compute_special_price()
         
         return result
 
     def _compute_special_price(self):
         """
-        Calculate variant price based on numeric value and price_per_measurement
+        Calculate variant prices based on numeric value and price_per_measurement
         Price = numeric_value * price_per_measurement
         Updates price_extra of attribute values so lst_price reflects the correct price
         Keeps list_price at 0
+
+        Works on the whole recordset at once: the numeric value of each attribute
+        value is parsed once, the new price_extra values are computed in memory
+        and written with one grouped write per distinct price, only for the
+        attribute values whose price actually changes.
         """
-        for variant in self:
-            if not variant.is_special or not variant.price_per_measurement:
-                _logger.debug(
-                    'Skipping price calculation for variant %s (ID: %s): is_special=%s, price_per_measurement=%s',
-                    variant.display_name, variant.id, variant.is_special, variant.price_per_measurement
-                )
+        variants = self.filtered(lambda v: v.is_special and v.price_per_measurement)
+        if not variants:
+            return
+
+        # Ensure list_price is at 0 (list_price lives on the template)
+        templates = variants.product_tmpl_id.filtered(lambda t: t.list_price != 0.0)
+        if templates:
+            templates.sudo().write({'list_price': 0.0})
+
+        # lst_price = list_price + sum(price_extra from attributes), so if list_price=0, lst_price=sum(price_extra)
+        # Variants are processed in order so that attribute values shared by several
+        # variants end up with the same price as when they were written one by one.
+        numeric_values = {}
+        new_prices = {}
+        for variant in variants:
+            attr_values = variant.product_template_attribute_value_ids
+            if not attr_values:
                 continue
-            
-            try:
-                # Get the unique numeric value for this variant
-                numeric_value = variant._get_variant_numeric_value()
-                calculated_price = numeric_value * variant.price_per_measurement
-                
-                # Ensure list_price is at 0
-                if variant.list_price != 0.0:
-                    variant.sudo().write({'list_price': 0.0})
-                
-                # Update price_extra in variant attribute values
-                # lst_price = list_price + sum(price_extra from attributes), so if list_price=0, lst_price=sum(price_extra)
-                # Update price_extra of each attribute value based on its numeric value
-                if variant.product_template_attribute_value_ids:
-                    attr_values = variant.product_template_attribute_value_ids
-                    
-                    # First, reset all price_extra to 0 for this variant
-                    for attr_value in attr_values:
-                        if attr_value.price_extra != 0.0:
-                            attr_value.sudo().write({'price_extra': 0.0})
-                    
-                    # Find the attribute that has the numeric value and update its price_extra
-                    found_numeric_attr = False
-                    for attr_value in attr_values:
-                        name = attr_value.name or ''
-                        numbers = re.findall(r'\d+\.?\d*', name)
-                        if numbers:
-                            try:
-                                attr_numeric_value = float(numbers[0])
-                                # Calculate price_extra based on the attribute's numeric value
-                                attr_price_extra = attr_numeric_value * variant.price_per_measurement
-                                
-                                # Update this attribute's price_extra
-                                attr_value.sudo().write({'price_extra': attr_price_extra})
-                                found_numeric_attr = True
-                                
-                                _logger.info(
-                                    'Updated price_extra for variant %s (ID: %s): attribute=%s (value=%s), price_extra=%s',
-                                    variant.display_name, variant.id, attr_value.name, attr_numeric_value, attr_price_extra
-                                )
-                                break
-                            except ValueError:
-                                continue
-                    
-                    # If no attribute with numeric value found, use variant index
-                    if not found_numeric_attr and len(attr_values) > 0:
-                        first_attr_value = attr_values[0]
-                        first_attr_value.sudo().write({'price_extra': calculated_price})
-                        
-                        _logger.info(
-                            'Updated price_extra (using variant index) for variant %s (ID: %s): attribute=%s, price_extra=%s',
-                            variant.display_name, variant.id, first_attr_value.name, calculated_price
-                        )
-                
-                # Force recomputation of computed fields
-                variant.invalidate_recordset(['list_price', 'lst_price', 'price', 'price_extra'])
-                variant.refresh()
-                
-                # Get values after update
-                updated_list_price = variant.list_price
-                updated_lst_price = variant.lst_price
-                updated_price_extra = sum(variant.product_template_attribute_value_ids.mapped('price_extra')) if variant.product_template_attribute_value_ids else 0.0
-                
-                _logger.info(
-                    'Price calculated for variant %s (ID: %s): numeric_value=%s * price_per_measurement=%s = %s | list_price: %s | price_extra_total: %s | lst_price: %s',
-                    variant.display_name, variant.id, numeric_value, 
-                    variant.price_per_measurement, calculated_price,
-                    updated_list_price, updated_price_extra, updated_lst_price
-                )
-            except Exception as e:
-                _logger.error(
-                    'Error calculating price for variant %s (ID: %s): %s',
-                    variant.display_name, variant.id, str(e), exc_info=True
-                )
+            price_per_measurement = variant.price_per_measurement
+
+            # First, reset all price_extra to 0 for this variant
+            for attr_value in attr_values:
+                new_prices[attr_value] = 0.0
+
+            # Find the attribute that has the numeric value and set its price_extra
+            numeric_attr = False
+            for attr_value in attr_values:
+                if attr_value.id not in numeric_values:
+                    numeric_values[attr_value.id] = _extract_numeric_value(attr_value.name)
+                if numeric_values[attr_value.id] is not None:
+                    numeric_attr = attr_value
+                    new_prices[attr_value] = numeric_values[attr_value.id] * price_per_measurement
+                    break
+
+            # If no attribute with numeric value found, use variant index
+            if not numeric_attr:
+                new_prices[attr_values[0]] = variant._get_variant_numeric_value() * price_per_measurement
+
+        precision = self.env['decimal.precision'].precision_get('Product Price')
+        to_write = defaultdict(lambda: self.env['product.template.attribute.value'])
+        for attr_value, price_extra in new_prices.items():
+            if float_compare(attr_value.price_extra, price_extra, precision_digits=precision):
+                to_write[price_extra] |= attr_value
+
+        for price_extra, attr_values in to_write.items():
+            attr_values.sudo().write({'price_extra': price_extra})
+
+        _logger.info(
+            'Special prices computed for %s variants: %s attribute values updated',
+            len(variants), sum(len(attr_values) for attr_values in to_write.values())
+        )
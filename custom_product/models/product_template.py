@@ -35,15 +35,13 @@ class ProductTemplate(models.Model):
         
         # If price_per_measurement or is_special changed, recalculate variant prices
         if 'price_per_measurement' in vals or 'is_special' in vals:
-            for template in self:
-                if template.is_special and template.price_per_measurement:
-                    _logger.info(
-                        'Recalculating prices for all variants of template %s (ID: %s). '
-                        'Variants found: %s',
-                        template.name, template.id, len(template.product_variant_ids)
-                    )
-                    # Recalculate prices for all variants individually
-                    for variant in template.product_variant_ids:
-                        variant._compute_special_price()
+            templates = self.filtered(lambda t: t.is_special and t.price_per_measurement)
+            if templates:
+                _logger.info(
+                    'Recalculating prices for all variants of templates %s. Variants found: %s',
+                    templates.ids, len(templates.product_variant_ids)
+                )
+                # Recalculate prices for all variants of all templates in one batch
+                templates.product_variant_ids._compute_special_price()
         
         return result
@@ -3,5 +3,6 @@ from . import (
     mrp_production,
     product_template,
     sale_order_line,
+    stock_move,
     stock_rule,
 )
@@ -35,9 +35,7 @@ class SaleOrderLine(models.Model):
         values = super(SaleOrderLine, self)._prepare_procurement_values(group_id)
         self.ensure_one()
 
-        _logger.info("Measurement value: %s", self.measurement)
-        _logger.info("Variable measurement ? %s", self.variable_measurement)
-        if self.variable_measurement:
-            values["measurement"] = self.measurement
-        _logger.info(f"Procurement values: {values}")
+        # Always carry the measurement so manufacturing rules need no lookup
+        values["measurement"] = self.measurement
+        _logger.debug(f"Procurement values: {values}")
         return values
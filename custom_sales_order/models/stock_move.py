@@ -0,0 +1,12 @@
+from odoo import models
+
+
+class StockMove(models.Model):
+    _inherit = "stock.move"
+
+    # Carry the sale order line measurement to the chained procurements (MTO)
+    def _prepare_procurement_values(self):
+        values = super(StockMove, self)._prepare_procurement_values()
+        if "sale_line_id" in self._fields and self.sale_line_id:
+            values["measurement"] = self.sale_line_id.measurement
+        return values
@@ -14,18 +14,43 @@ class StockRule(models.Model):
 
     @api.model
     def _run_manufacture(self, procurements):
-        for procurement, rule in procurements:
-            group = procurement.values.get("group_id")
-            if group and isinstance(group, self.env["procurement.group"].__class__):
-                domain = [
-                    ("order_id.procurement_group_id", "=", group.id),
-                    ("product_id", "=", procurement.product_id.id),
-                ]
-                so_line = self.env["sale.order.line"].search(domain, limit=1)
-                if so_line:
-                    procurement.values["measurement"] = so_line.measurement
+        # The measurement is normally carried in the procurement values (see
+        # sale.order.line and stock.move _prepare_procurement_values). For the
+        # procurements missing it, resolve all of them with one grouped lookup
+        # keyed by (procurement group, product).
+        ProcurementGroup = self.env["procurement.group"].__class__
+        missing = [
+            procurement
+            for procurement, rule in procurements
+            if "measurement" not in procurement.values
+            and isinstance(procurement.values.get("group_id"), ProcurementGroup)
+        ]
+        if missing:
+            measurements = self._get_sale_line_measurements(missing)
+            for procurement in missing:
+                key = (procurement.values["group_id"].id, procurement.product_id.id)
+                if key in measurements:
+                    procurement.values["measurement"] = measurements[key]
         super(StockRule, self)._run_manufacture(procurements)
 
+    @api.model
+    def _get_sale_line_measurements(self, procurements):
+        """Return {(procurement group id, product id): measurement} of the sale
+        order lines matching the given procurements"""
+        group_ids = {procurement.values["group_id"].id for procurement in procurements}
+        product_ids = {procurement.product_id.id for procurement in procurements}
+        so_lines = self.env["sale.order.line"].search(
+            [
+                ("order_id.procurement_group_id", "in", list(group_ids)),
+                ("product_id", "in", list(product_ids)),
+            ]
+        )
+        measurements = {}
+        for so_line in so_lines:
+            key = (so_line.order_id.procurement_group_id.id, so_line.product_id.id)
+            measurements.setdefault(key, so_line.measurement)
+        return measurements
+
     """
         Prepare the manufacturing order values.
     """
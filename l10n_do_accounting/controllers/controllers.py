@@ -19,12 +19,13 @@
 # along with NCF Manager.  If not, see <https://www.gnu.org/licenses/>.
 
 import json
-import re
 import logging
 
 from odoo import http
 from odoo.http import request
 
+from odoo.addons.l10n_do_accounting.models.dgii_rnc import normalize_name
+
 _logger = logging.getLogger(__name__)
 
 try:
@@ -35,27 +36,51 @@ except (ImportError, IOError) as err:
 
 class Odoojs(http.Controller):
 
+    def _is_dgii_ws_enabled(self):
+        """the live DGII service is only queried when dgii.wsmovil is set"""
+        return request.env['ir.config_parameter'].sudo(
+        ).get_param('dgii.wsmovil') == 'True'
+
+    def _dgii_check(self, num):
+        """rnc.check_dgii through the shared DGII answers cache"""
+        def fetch(key):
+            info = rnc.check_dgii(num)
+            if info is not None:
+                info["name"] = normalize_name(info["name"])
+            return info
+        return request.env['dgii.ws.cache'].sudo().get_or_fetch(
+            "check:%s" % num, fetch)
+
+    def _dgii_search(self, term):
+        """rnc.search_dgii through the shared DGII answers cache"""
+        def fetch(key):
+            result = rnc.search_dgii(term, end_at=20, start_at=1) or []
+            for d in result:
+                d["name"] = normalize_name(d["name"])
+            return result
+        return request.env['dgii.ws.cache'].sudo().get_or_fetch(
+            "search:%s" % normalize_name(term).upper(), fetch)
+
     @http.route('/dgii_ws', auth='public', cors="*")
     def index(self, **kwargs):
         term = kwargs.get("term", False)
-        query_dgii_wsmovil = request.env['ir.config_parameter'].sudo(
-        ).get_param('dgii.wsmovil')
+        if not term:
+            return
 
-        if term and query_dgii_wsmovil == 'True':
+        # answer from the local registry, fall back to DGII when configured
+        result = request.env['dgii.rnc'].sudo().lookup(term, limit=20)
+        if not result and self._is_dgii_ws_enabled():
             if term.isdigit() and len(term) in [9, 11]:
-                result = rnc.check_dgii(term)
+                result = self._dgii_check(term)
             else:
-                result = rnc.search_dgii(term, end_at=20, start_at=1)
-            if result is not None:
-                if not isinstance(result, list):
-                    result = [result]
+                result = self._dgii_search(term)
+            if result is not None and not isinstance(result, list):
+                result = [result]
 
-                for d in result:
-                    d["name"] = " ".join(
-                        re.split(r"\s+", d["name"], flags=re.UNICODE)
-                    )  # remove all duplicate white space from the name
-                    d["label"] = u"{} - {}".format(d["rnc"], d["name"])
-                return json.dumps(result)
+        if result:
+            for d in result:
+                d["label"] = u"{} - {}".format(d["rnc"], d["name"])
+            return json.dumps(result)
 
 
     @http.route('/validate_rnc/', auth='public', cors="*")
@@ -70,17 +95,15 @@ class Odoojs(http.Controller):
         if num.isdigit():
             if (len(num) == 9 and rnc.is_valid(num)) or (len(num) == 11 and
                                                          cedula.is_valid(num)):
-                try:
-                    info = rnc.check_dgii(num)
-                except Exception as err:
-                    info = None
-                    _logger.error(">>> " + str(err))
-
-                if info is not None:
-                    # remove all duplicate white space from the name
-                    info["name"] = " ".join(
-                        re.split(r"\s+", info["name"], flags=re.UNICODE))
+                result = request.env['dgii.rnc'].sudo().lookup(num)
+                info = result[0] if result else None
+                if info is None:
+                    try:
+                        info = self._dgii_check(num)
+                    except Exception as err:
+                        info = None
+                        _logger.error(">>> " + str(err))
 
                 return json.dumps({"is_valid": True, "info": info})
 
-        return json.dumps({"is_valid": False})
\ No newline at end of file
+        return json.dumps({"is_valid": False})
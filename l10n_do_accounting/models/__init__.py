@@ -6,3 +6,5 @@ from . import res_partner
 from . import account_payment_method
 from . import sale_order
 # from . import account_invoice_send
+from . import dgii_rnc
+from . import dgii_ws_cache
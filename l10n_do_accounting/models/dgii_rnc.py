@@ -0,0 +1,140 @@
+import io
+import logging
+import re
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+def normalize_name(name):
+    """remove all duplicate white space from the name"""
+    return " ".join(re.split(r"\s+", name or "", flags=re.UNICODE)).strip()
+
+
+class DgiiRnc(models.Model):
+    """
+    Local copy of the DGII RNC/Cédula registry, loaded from the bulk file
+    published by DGII (DGII_RNC.TXT), so partner lookups don't depend on the
+    DGII web service.
+    """
+    _name = "dgii.rnc"
+    _description = "DGII RNC Registry"
+    _rec_name = "name"
+    _order = "rnc"
+
+    rnc = fields.Char(string="RNC/Cédula", required=True)
+    name = fields.Char(string="Name", index="trigram")
+    commercial_name = fields.Char(string="Commercial name", index="trigram")
+    category = fields.Char(string="Category")
+    status = fields.Char(string="Status")
+    payment_regime = fields.Char(string="Payment regime")
+
+    _sql_constraints = [
+        ("rnc_uniq", "unique(rnc)", "The RNC/Cédula must be unique in the registry."),
+    ]
+
+    # Columns of the DGII bulk file, pipe separated
+    _file_columns = {
+        "rnc": 0,
+        "name": 1,
+        "commercial_name": 2,
+        "category": 3,
+        "status": 9,
+        "payment_regime": 10,
+    }
+
+    def _to_dgii_result(self):
+        """Return the records as the dicts returned by stdnum.do.rnc.check_dgii"""
+        return [
+            {
+                "rnc": record.rnc,
+                "name": record.name,
+                "commercial_name": record.commercial_name,
+                "category": record.category,
+                "status": record.status,
+                "payment_regime": record.payment_regime,
+            }
+            for record in self
+        ]
+
+    @api.model
+    def lookup(self, term, limit=20):
+        """
+        Search the registry: exact match when term is a RNC (9 digits) or a
+        cédula (11 digits), prefix/substring name search otherwise.
+            :param term string: RNC, cédula or (part of) the name
+            :return list: stdnum.do.rnc like results
+        """
+        term = (term or "").strip()
+        if not term:
+            return []
+        if term.isdigit() and len(term) in [9, 11]:
+            records = self.search([("rnc", "=", term)], limit=1)
+        else:
+            records = self.search(
+                ["|", ("name", "ilike", term), ("commercial_name", "=ilike", term + "%")],
+                limit=limit,
+            )
+        return records._to_dgii_result()
+
+    @api.model
+    def import_rnc_file(self, fileobj, encoding="latin-1", batch_size=5000):
+        """
+        Load the DGII bulk RNC file into the registry. The file is read line
+        by line and upserted in batches, so a full registry import runs in
+        bounded memory.
+            :param fileobj: binary file like object
+            :return int: number of imported lines
+        """
+        columns = list(self._file_columns)
+        count = 0
+        batch = []
+        for line in io.TextIOWrapper(fileobj, encoding=encoding, errors="replace"):
+            values = line.rstrip("\r\n").split("|")
+            number = values[0].strip().replace("-", "")
+            if not number.isdigit():
+                continue
+            row = [number]
+            for column in columns[1:]:
+                index = self._file_columns[column]
+                row.append(normalize_name(values[index]) if index < len(values) else None)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                count += self._upsert_rnc_rows(columns, batch)
+                batch = []
+        if batch:
+            count += self._upsert_rnc_rows(columns, batch)
+        self.invalidate_model()
+        _logger.info("DGII RNC registry: %s records imported", count)
+        return count
+
+    def _upsert_rnc_rows(self, columns, rows):
+        # the file may list the same number twice, keep the last one
+        rows = list({row[0]: row for row in rows}.values())
+        updates = ", ".join("%s = EXCLUDED.%s" % (column, column) for column in columns[1:])
+        self.env.cr.execute(
+            """
+            INSERT INTO dgii_rnc ({columns}, create_uid, create_date, write_uid, write_date)
+            SELECT *, %s, (now() at time zone 'UTC'), %s, (now() at time zone 'UTC')
+            FROM unnest({arrays})
+            ON CONFLICT (rnc) DO UPDATE SET {updates},
+                write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+            """.format(
+                columns=", ".join(columns),
+                arrays=", ".join(["%s::varchar[]"] * len(columns)),
+                updates=updates,
+            ),
+            [self.env.uid, self.env.uid] + [list(values) for values in zip(*rows)],
+        )
+        return len(rows)
+
+    @api.model
+    def _cron_import_rnc_file(self):
+        """Import the registry from the local file set in dgii.rnc_file_path"""
+        path = self.env["ir.config_parameter"].sudo().get_param("dgii.rnc_file_path")
+        if not path:
+            raise UserError(_("Set the path of the DGII RNC file in the dgii.rnc_file_path parameter."))
+        with open(path, "rb") as fileobj:
+            return self.import_rnc_file(fileobj)
@@ -0,0 +1,176 @@
+import json
+import logging
+import time
+from datetime import timedelta
+
+import psycopg2
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# advisory lock namespace used to collapse concurrent lookups of the same term
+DGII_WS_LOCK = 0x44474949
+
+# last_hit is only refreshed when older than this, it only orders the eviction
+LAST_HIT_PRECISION = timedelta(minutes=15)
+
+# seconds waited for the worker fetching a term, and between two polls
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.2
+
+
+class DgiiWsCache(models.Model):
+    """
+    Cache of the DGII web service answers, shared by all workers. Unknown
+    terms are cached too (negative caching) with their own TTL, and the
+    table is bounded in size by evicting the least recently used terms on
+    every insert, a cron purges the expired ones.
+    """
+    _name = "dgii.ws.cache"
+    _description = "DGII Web Service Cache"
+    _rec_name = "term"
+    _log_access = False
+
+    term = fields.Char(required=True, index=True)
+    result = fields.Text(help="JSON answer of DGII, empty when the term is unknown")
+    expire_at = fields.Datetime(required=True)
+    last_hit = fields.Datetime(required=True, index=True)
+
+    _sql_constraints = [
+        ("term_uniq", "unique(term)", "The term must be unique in the cache."),
+    ]
+
+    @api.model
+    def _get_cache_params(self):
+        get_param = self.env["ir.config_parameter"].sudo().get_param
+        return {
+            "ttl": int(get_param("dgii.cache_ttl", 86400)),
+            "negative_ttl": int(get_param("dgii.cache_negative_ttl", 3600)),
+            "size": int(get_param("dgii.cache_size", 10000)),
+        }
+
+    @api.model
+    def get_or_fetch(self, term, fetch):
+        """
+        Return the cached DGII answer for term, calling fetch(term) when it is
+        missing or expired. Concurrent requests for the same term wait for
+        the first one and reuse its answer instead of querying DGII again.
+            :param term string: cache key
+            :param fetch: callable querying DGII, returns a JSON serializable
+                value or None when the term is unknown
+        """
+        hit, result = self._read_cache(self.env.cr, term)
+        if hit:
+            return result
+
+        # The first worker missing the term takes a session lock on a cursor of
+        # its own, fetches the answer and commits it with that same cursor.
+        # The others poll the cache (a new transaction, hence snapshot, each
+        # time) until the answer is there or the lock is released.
+        params = self._get_cache_params()
+        with self.pool.cursor() as cr:
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while True:
+                cr.execute(
+                    "SELECT pg_try_advisory_lock(%s, hashtext(%s))", [DGII_WS_LOCK, term]
+                )
+                locked = cr.fetchone()[0]
+                hit, result = self._read_cache(cr, term)
+                if hit or locked or time.monotonic() > deadline:
+                    break
+                cr.commit()
+                time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                if not hit:
+                    result = fetch(term)
+                    self._write_cache(cr, term, result, params)
+                    cr.commit()
+            finally:
+                if locked:
+                    # the lock outlives the transaction, release it even when
+                    # the fetch or the write failed
+                    cr.rollback()
+                    cr.execute(
+                        "SELECT pg_advisory_unlock(%s, hashtext(%s))", [DGII_WS_LOCK, term]
+                    )
+                    cr.commit()
+        return result
+
+    @api.model
+    def _read_cache(self, cr, term):
+        now = fields.Datetime.now()
+        cr.execute(
+            "SELECT id, result, last_hit FROM dgii_ws_cache WHERE term = %s AND expire_at > %s",
+            [term, now],
+        )
+        row = cr.fetchone()
+        if row is None:
+            return False, None
+        if row[2] < now - LAST_HIT_PRECISION:
+            self._touch_cache(cr, row[0], now)
+        return True, json.loads(row[1]) if row[1] else None
+
+    @api.model
+    def _touch_cache(self, cr, cache_id, now):
+        # on the reading transaction: skip the row when another worker is
+        # refreshing it, and give up when it refreshed it first, which is just
+        # as good
+        try:
+            with cr.savepoint(flush=False):
+                cr.execute(
+                    """
+                    UPDATE dgii_ws_cache SET last_hit = %s
+                    WHERE id IN (
+                        SELECT id FROM dgii_ws_cache WHERE id = %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    """,
+                    [now, cache_id],
+                )
+        except psycopg2.errors.SerializationFailure:
+            pass
+
+    @api.model
+    def _write_cache(self, cr, term, result, params):
+        now = fields.Datetime.now()
+        ttl = params["ttl"] if result else params["negative_ttl"]
+        cr.execute(
+            """
+            INSERT INTO dgii_ws_cache (term, result, expire_at, last_hit)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (term) DO UPDATE SET result = EXCLUDED.result,
+                expire_at = EXCLUDED.expire_at, last_hit = EXCLUDED.last_hit
+            """,
+            [term, json.dumps(result) if result else None, now + timedelta(seconds=ttl), now],
+        )
+        self._evict_least_recently_used(cr, params["size"])
+
+    @api.model
+    def _evict_least_recently_used(self, cr, size):
+        """Keep the size most recently used terms, walking the last_hit index"""
+        cr.execute(
+            """
+            DELETE FROM dgii_ws_cache WHERE id IN (
+                SELECT id FROM dgii_ws_cache
+                ORDER BY last_hit DESC
+                OFFSET %s
+            )
+            """,
+            [size],
+        )
+        return cr.rowcount
+
+    @api.model
+    def _cron_evict(self):
+        """Evict the expired terms, then the least recently used ones above
+        the dgii.cache_size limit"""
+        params = self._get_cache_params()
+        now = fields.Datetime.now()
+        self.env.cr.execute("DELETE FROM dgii_ws_cache WHERE expire_at <= %s", [now])
+        expired = self.env.cr.rowcount
+        evicted = self._evict_least_recently_used(self.env.cr, params["size"])
+        _logger.info(
+            "DGII cache: %s expired and %s least recently used terms evicted",
+            expired, evicted,
+        )
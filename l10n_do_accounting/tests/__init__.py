@@ -2,3 +2,4 @@
 from . import common
 from . import test_account_fiscal_sequence
 from . import test_account_invoice
+from . import test_dgii_rnc
@@ -0,0 +1,42 @@
+import io
+
+from odoo.tests.common import TransactionCase
+
+RNC_FILE = (
+    "101000011|EMPRESA   DE  PRUEBA SRL|PRUEBA|COMERCIO|||||01/01/2000|ACTIVO|NORMAL\n"
+    "00100000018|JUAN PEREZ||||||||ACTIVO|NORMAL\n"
+    "NO-RNC|header line\n"
+    "101000011|EMPRESA DE PRUEBA SRL|PRUEBA 2|COMERCIO|||||01/01/2000|SUSPENDIDO|NORMAL\n"
+)
+
+
+class DgiiRncTests(TransactionCase):
+
+    def setUp(self):
+        super(DgiiRncTests, self).setUp()
+        self.registry_obj = self.env["dgii.rnc"]
+        self.registry_obj.import_rnc_file(io.BytesIO(RNC_FILE.encode("latin-1")))
+
+    def test_001_import_upserts(self):
+        """
+        Lines without a number are skipped and a RNC listed twice keeps
+        its last values
+        """
+        records = self.registry_obj.search([("rnc", "in", ["101000011", "00100000018"])])
+        self.assertEqual(len(records), 2)
+        company = records.filtered(lambda r: r.rnc == "101000011")
+        self.assertEqual(company.name, "EMPRESA DE PRUEBA SRL")
+        self.assertEqual(company.commercial_name, "PRUEBA 2")
+        self.assertEqual(company.status, "SUSPENDIDO")
+
+    def test_002_lookup(self):
+        """
+        Numbers are looked up exactly, anything else by name
+        """
+        result = self.registry_obj.lookup("00100000018")
+        self.assertEqual([r["name"] for r in result], ["JUAN PEREZ"])
+
+        result = self.registry_obj.lookup("de prueba")
+        self.assertEqual([r["rnc"] for r in result], ["101000011"])
+
+        self.assertEqual(self.registry_obj.lookup("101000012"), [])
@@ -16,9 +16,11 @@
         'security/ir.model.access.csv',
         'security/ir_rule.xml',
         'data/data.xml',
+        'data/ir_cron_data.xml',
         'views/res_config_settings_views.xml',
         'views/pos_order_views.xml',
         'views/pos_payment_method_views.xml',
+        'views/pos_session_views.xml',
     ],
     'assets': {
         'point_of_sale.assets': [
@@ -31,6 +31,11 @@ class PosConfig(models.Model):
         string='Days',
         default=30,
     )
+    l10n_do_aggregate_payments = fields.Boolean(
+        string='Aggregate payments',
+        help="When closing a fiscal POS session, create one payment per payment "
+             "method, customer and day instead of one payment per POS payment.",
+    )
 
     @api.constrains('l10n_do_type_limit_order_history_days')
     def _check_l10n_do_type_limit_order_history(self):
@@ -83,6 +83,13 @@ class PosOrder(models.Model):
 
         return invoice_vals
 
+    def _apply_invoice_payments(self):
+        # The background closing of the session creates and reconciles the
+        # payment moves of the orders it invoices in chunks of its own
+        if self.env.context.get("l10n_do_defer_invoice_payments"):
+            return self.env["account.move"]
+        return super(PosOrder, self)._apply_invoice_payments()
+
     @api.model
     def _payment_fields(self, order, ui_paymentline):
 
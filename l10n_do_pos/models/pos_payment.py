@@ -15,7 +15,7 @@ class PosPayment(models.Model):
         return {
             'amount': amount,
             'payment_type': 'inbound' if amount >= 0 else 'outbound',
-            'date': payment.payment_date,
+            'date': payment._get_payment_local_date(),
             'partner_id': payment.partner_id.id if payment.partner_id else False,
             'currency_id': payment.currency_id.id,
             'pos_session_id': payment_session.id,
@@ -24,30 +24,72 @@ class PosPayment(models.Model):
             'journal_id': payment_method.journal_id.id,
         }
 
+    def _get_payment_local_date(self):
+        """Date of the payment in the timezone of the session's user, so
+        payments taken in the evening belong to the day they were taken"""
+        self.ensure_one()
+        tz = self.session_id.user_id.tz or self.env.user.tz or 'UTC'
+        return fields.Datetime.context_timestamp(
+            self.with_context(tz=tz), self.payment_date
+        ).date()
+
+    def _get_payment_groups(self):
+        """Split the non-cash payments into the groups that get one account.payment
+        each: one per payment, or per method, partner, day and sign when the
+        POS aggregates its payments."""
+        payments = self.filtered(
+            lambda p: not p.payment_method_id.is_cash_count
+            and not p.payment_method_id.is_credit_note
+            and p.payment_method_id.type != 'pay_later'
+            and not float_is_zero(p.amount, precision_rounding=p.pos_order_id.currency_id.rounding)
+        )
+        if not payments or not payments.session_id.config_id[:1].l10n_do_aggregate_payments:
+            return list(payments)
+
+        groups = {}
+        for payment in payments:
+            key = (
+                payment.payment_method_id.id,
+                payment.partner_id.id,
+                payment._get_payment_local_date(),
+                payment.amount > 0,
+            )
+            groups[key] = groups.get(key, self.browse()) | payment
+        return list(groups.values())
+
+    def _get_credit_note_moves(self, credit_notes):
+        """Return {(partner id, ref): account.move} of the posted fiscal credit
+        notes referenced by the given credit note payments, in one search"""
+        moves = self.env['account.move'].search([
+            ('partner_id', 'in', credit_notes.partner_id.ids),
+            ('ref', 'in', list(set(credit_notes.mapped('name')))),
+            ('move_type', '=', 'out_refund'),
+            ('is_l10n_do_fiscal_invoice', '=', True),
+            ('company_id', '=', self.env.company.id),
+            ('state', '=', 'posted')
+        ])
+        result = {}
+        for move in moves:
+            result.setdefault((move.partner_id.id, move.ref), move)
+        return result
+
     def _create_payment_moves(self, is_reverse=False):
         
         if self and not self.mapped('session_id.config_id')[0].l10n_do_fiscal_journal:
             return super(PosPayment, self)._create_payment_moves(is_reverse)
 
         result = self.env['account.move']
-        for payment in self.filtered(lambda p: not p.payment_method_id.is_cash_count and not p.payment_method_id.is_credit_note):
-            order = payment.pos_order_id
-            payment_method = payment.payment_method_id
-            
-            if payment_method.type == 'pay_later' or float_is_zero(payment.amount, precision_rounding=order.currency_id.rounding):
-                continue
-
-            account_payment = self.env['account.payment'].create(
-                self._get_payment_values(payment)
-            )
-            account_payment.action_post()
-            account_payment.move_id.write({
-                'pos_payment_ids': payment.ids,
-            })
-            payment.write({
-                'account_move_id': account_payment.move_id.id
-            })
-            result |= account_payment.move_id
+        # {account.move: pos.payment} linked with one write per move at the end
+        payments_by_move = {}
+        payment_groups = self._get_payment_groups()
+        if payment_groups:
+            account_payments = self.env['account.payment'].create([
+                self._get_payment_values(payments) for payments in payment_groups
+            ])
+            account_payments.action_post()
+            for payments, account_payment in zip(payment_groups, account_payments):
+                payments_by_move[account_payment.move_id] = payments
+            result |= account_payments.move_id
 
         
         pos_payment_cash = self.filtered(lambda p: p.payment_method_id.is_cash_count and not p.payment_method_id.is_credit_note)
@@ -70,33 +112,25 @@ class PosPayment(models.Model):
                         super(self.env['account.payment'].__class__, account_payment_cash).action_post()
                     else:
                         raise
-                account_payment_cash.move_id.write({
-                    'pos_payment_ids': pos_payment_cash.ids,
-                })
-                pos_payment_cash.write({
-                    'account_move_id': account_payment_cash.move_id.id
-                })
+                payments_by_move[account_payment_cash.move_id] = pos_payment_cash
                 result |= account_payment_cash.move_id
                 
-        for credit_note in self.filtered(lambda p: p.payment_method_id.is_credit_note and p.name):
-            account_move_credit_note = self.env['account.move'].search([                    
-                    ('partner_id', '=', credit_note.partner_id.id),
-                    ('ref', '=', credit_note.name),
-                    ('move_type', '=', 'out_refund'),
-                    ('is_l10n_do_fiscal_invoice', '=', True),
-                    ('company_id', '=', self.env.company.id),
-                    ('state', '=', 'posted')
-                ], limit=1
-            )
-            
-            if account_move_credit_note and credit_note.amount > 0:
-                account_move_credit_note.write({
-                    'pos_payment_ids': credit_note.ids,
-                })
-                credit_note.write({
-                    'account_move_id': account_move_credit_note.id
-                })
-                result |= account_move_credit_note
+        credit_notes = self.filtered(lambda p: p.payment_method_id.is_credit_note and p.name and p.amount > 0)
+        if credit_notes:
+            account_move_credit_notes = self._get_credit_note_moves(credit_notes)
+            for credit_note in credit_notes:
+                account_move_credit_note = account_move_credit_notes.get(
+                    (credit_note.partner_id.id, credit_note.name)
+                )
+                if account_move_credit_note:
+                    payments_by_move[account_move_credit_note] = (
+                        payments_by_move.get(account_move_credit_note, self.browse()) | credit_note
+                    )
+                    result |= account_move_credit_note
+
+        # pos_payment_ids is the inverse of account_move_id, one write links both
+        for move, payments in payments_by_move.items():
+            payments.write({'account_move_id': move.id})
 
         return result
 
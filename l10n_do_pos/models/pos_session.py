@@ -1,9 +1,203 @@
+import logging
+import threading
+
 from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
 
 
 class PosSession(models.Model):
     _inherit = 'pos.session'
 
+    l10n_do_closing_state = fields.Selection(
+        selection=[
+            ('queued', 'Queued'),
+            ('processing', 'In progress'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        string='Background closing',
+        copy=False,
+        readonly=True,
+    )
+    l10n_do_closing_checkpoint = fields.Integer(
+        string='Last processed order',
+        copy=False,
+        readonly=True,
+        help='Id of the last order invoiced by the background closing, '
+             'processing resumes after it.',
+    )
+    l10n_do_closing_payment_checkpoint = fields.Integer(
+        string='Last reconciled order',
+        copy=False,
+        readonly=True,
+        help='Id of the last order whose payment moves were created and '
+             'reconciled by the background closing, processing resumes after it.',
+    )
+    l10n_do_closing_progress = fields.Float(
+        string='Closing progress',
+        compute='_compute_l10n_do_closing_progress',
+    )
+    l10n_do_closing_error = fields.Text(
+        string='Closing error',
+        copy=False,
+        readonly=True,
+    )
+
+    @api.depends('l10n_do_closing_checkpoint', 'l10n_do_closing_payment_checkpoint', 'order_ids.state')
+    def _compute_l10n_do_closing_progress(self):
+        for session in self:
+            if session.l10n_do_closing_state == 'done':
+                session.l10n_do_closing_progress = 100.0
+                continue
+            orders = session._l10n_do_get_closing_orders(pending_only=False)
+            pending = (
+                session._l10n_do_get_closing_orders()
+                | session._l10n_do_get_closing_payment_orders()
+            )
+            session.l10n_do_closing_progress = (
+                100.0 * (len(orders) - len(pending)) / len(orders) if orders else 0.0
+            )
+
+    def _l10n_do_get_closing_orders(self, pending_only=True, limit=None):
+        """Fiscal orders of the session that need an invoice (and its payment
+        moves) before the session can be closed"""
+        self.ensure_one()
+        domain = [
+            ('session_id', '=', self.id),
+            ('ncf', '!=', False),
+            ('amount_total', '!=', 0),
+        ]
+        if pending_only:
+            domain += [
+                ('state', '=', 'paid'),
+                ('id', '>', self.l10n_do_closing_checkpoint),
+            ]
+        else:
+            domain += [('state', 'in', ('paid', 'done', 'invoiced'))]
+        return self.env['pos.order'].search(domain, order='id', limit=limit)
+
+    def _l10n_do_get_closing_payment_orders(self, limit=None):
+        """Invoiced fiscal orders of the session with payments that still have
+        no payment move"""
+        self.ensure_one()
+        return self.env['pos.order'].search([
+            ('session_id', '=', self.id),
+            ('ncf', '!=', False),
+            ('state', '=', 'invoiced'),
+            ('account_move', '!=', False),
+            ('payment_ids.account_move_id', '=', False),
+            ('id', '>', self.l10n_do_closing_payment_checkpoint),
+        ], order='id', limit=limit)
+
+    def _l10n_do_check_closing_cash_count(self):
+        """Whether the session can be closed without the cashier: the cash
+        count is recorded, or the POS has no cash control"""
+        self.ensure_one()
+        return not self.config_id.cash_control or self.state == 'closing_control'
+
+    def action_l10n_do_queue_closing(self):
+        """Close the session in the background, in committed chunks of orders"""
+        for session in self:
+            if not session.config_id.l10n_do_fiscal_journal:
+                raise UserError(_('Background closing is only available for fiscal POS.'))
+            if session.state not in ('opened', 'closing_control'):
+                raise UserError(_('Session %s can not be closed.', session.name))
+            if not session._l10n_do_check_closing_cash_count():
+                raise UserError(_(
+                    'Session %s uses cash control, count the cash from the POS '
+                    'before closing it in background.', session.name))
+            if any(order.state == 'draft' for order in session.order_ids):
+                raise UserError(_("You cannot close the POS when orders are still in draft"))
+        self.write({'l10n_do_closing_state': 'queued', 'l10n_do_closing_error': False})
+        self.env.ref('l10n_do_pos.ir_cron_l10n_do_pos_session_closing')._trigger()
+
+    @api.model
+    def _cron_l10n_do_process_closing(self, chunk_size=100):
+        """Close the queued sessions in committed chunks: invoice the pending
+        fiscal orders, then create and reconcile their payment moves, saving a
+        checkpoint after each chunk so a failed or interrupted closing resumes
+        where it stopped, then validate the sessions. Sessions with cash
+        control are only closed once their cash count is recorded."""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        sessions = self.search([('l10n_do_closing_state', 'in', ('queued', 'processing'))])
+        for session in sessions:
+            if not session._l10n_do_check_closing_cash_count():
+                continue
+            session = session.with_company(session.company_id)
+            try:
+                session.l10n_do_closing_state = 'processing'
+                while session._l10n_do_process_closing_chunk(chunk_size):
+                    if auto_commit:
+                        self.env.cr.commit()
+                while session._l10n_do_process_closing_payment_chunk(chunk_size):
+                    if auto_commit:
+                        self.env.cr.commit()
+                if session.state != 'closed':
+                    session.action_pos_session_closing_control()
+                session.l10n_do_closing_state = 'done'
+                if auto_commit:
+                    self.env.cr.commit()
+            except Exception as e:
+                if not auto_commit:
+                    raise
+                self.env.cr.rollback()
+                _logger.exception('Background closing of POS session %s failed', session.name)
+                session.write({'l10n_do_closing_state': 'failed', 'l10n_do_closing_error': str(e)})
+                self.env.cr.commit()
+
+    def _l10n_do_process_closing_chunk(self, chunk_size):
+        """Invoice the next chunk of pending orders, return whether there was one.
+        Their payment moves are left to _l10n_do_process_closing_payment_chunk."""
+        self.ensure_one()
+        orders = self._l10n_do_get_closing_orders(limit=chunk_size)
+        if not orders:
+            return False
+        for order in orders:
+            if not order.partner_id:
+                if not self.config_id.pos_partner_id:
+                    raise UserError(
+                        _("This point of sale not have default customer, please set default customer in config POS")
+                    )
+                order.partner_id = self.config_id.pos_partner_id
+        orders.with_context(l10n_do_defer_invoice_payments=True)._generate_pos_order_invoice()
+        self.l10n_do_closing_checkpoint = orders[-1].id
+        _logger.info(
+            'POS session %s: %s orders invoiced by background closing (up to order %s)',
+            self.name, len(orders), orders[-1].id
+        )
+        return True
+
+    def _l10n_do_process_closing_payment_chunk(self, chunk_size):
+        """Create the payment moves of the next chunk of invoiced orders and
+        reconcile them with the invoices, return whether there was one"""
+        self.ensure_one()
+        orders = self._l10n_do_get_closing_payment_orders(limit=chunk_size)
+        if not orders:
+            return False
+        payments = orders.payment_ids.filtered(lambda p: not p.account_move_id)
+        payment_moves = payments.sudo()._create_payment_moves()
+        lines = (orders.account_move | payment_moves).line_ids.filtered(
+            lambda line: line.account_id.reconcile
+            and line.account_id.account_type == 'asset_receivable'
+            and line.partner_id
+            and not line.reconciled
+        )
+        lines_by_account_partner = {}
+        for line in lines:
+            key = (line.account_id, line.partner_id.commercial_partner_id)
+            lines_by_account_partner[key] = lines_by_account_partner.get(key, line.browse()) | line
+        for account_lines in lines_by_account_partner.values():
+            if len(account_lines) > 1:
+                account_lines.sudo().reconcile()
+        self.l10n_do_closing_payment_checkpoint = orders[-1].id
+        _logger.info(
+            'POS session %s: payments of %s orders reconciled by background closing (up to order %s)',
+            self.name, len(orders), orders[-1].id
+        )
+        return True
+
     def _create_invoice_receivable_lines(self, data):
         if self.config_id.l10n_do_fiscal_journal:
             data.update({
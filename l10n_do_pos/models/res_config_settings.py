@@ -21,3 +21,7 @@ class ResConfigSettings(models.TransientModel):
         related='pos_config_id.l10n_do_type_limit_order_history_days',
         readonly=False
     )
+    l10n_do_aggregate_payments = fields.Boolean(
+        related='pos_config_id.l10n_do_aggregate_payments',
+        readonly=False
+    )
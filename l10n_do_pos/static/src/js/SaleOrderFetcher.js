@@ -15,7 +15,11 @@ odoo.define('l10n_do_pos.SaleOrderFetcher', function (require) {
             model: 'sale.order',
             method: 'search_read',
             args: [domain, this.orderFields, offset, limit],
-            context: this.comp.env.session.user_context,
+            // Flag the lookup so the server only rewrites sale.order
+            // searches issued by the POS frontend.
+            context: Object.assign({}, this.comp.env.session.user_context, {
+                pos_sale_order_search: true,
+            }),
         });
 
         return saleOrders;
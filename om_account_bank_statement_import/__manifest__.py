@@ -11,7 +11,7 @@
     'maintainer': 'Odoo Mates',
     'license': 'LGPL-3',
     'description': """Generic Wizard to Import Bank Statements In Odoo 16 Community Edition.
-(This module does include any CSV and XLSX type import format.)""",
+(This module includes CSV, XLSX, OFX, CAMT.053 and MT940 import formats.)""",
     'data': [
         'security/ir.model.access.csv',
         'wizard/journal_creation.xml',
@@ -1,15 +1,14 @@
 # -*- coding: utf-8 -*-
 
-import base64
-
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
 from odoo.addons.base.models.res_bank import sanitize_account_number
+from odoo.tools import split_every
+from ..parsers import PARSERS
 import io
+import itertools
 import logging
-import tempfile
-import binascii
-from datetime import datetime
+from datetime import date, datetime
 
 _logger = logging.getLogger(__name__)
 
@@ -23,6 +22,12 @@ try:
 except ImportError:
     _logger.debug('Cannot `import xlrd`.')
 
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+    _logger.debug('Cannot `import openpyxl`.')
+
 
 class AccountBankStatementLine(models.Model):
     _inherit = "account.bank.statement.line"
@@ -51,147 +56,164 @@ class AccountBankStatementImport(models.TransientModel):
         currency = self.env['res.currency'].search([('name', '=', value)])
         return currency.id if currency else False
 
+    def _get_partner_ids(self, names):
+        """ Resolve partner names with one search, return {name: partner id} """
+        result = dict.fromkeys(names, False)
+        if names:
+            for partner in self.env['res.partner'].search([('name', 'in', list(names))]):
+                if not result[partner.name]:
+                    result[partner.name] = partner.id
+        return result
+
+    def _get_currency_ids(self, codes):
+        """ Resolve currency codes with one search, return {code: currency id} """
+        result = dict.fromkeys(codes, False)
+        if codes:
+            for currency in self.env['res.currency'].search([('name', 'in', list(codes))]):
+                result[currency.name] = currency.id
+        return result
+
     def create_statement(self, values):
         statement = self.env['account.bank.statement'].create(values)
         return statement
 
+    def _read_csv_rows(self, raw):
+        """ Lazily yield the rows of a CSV file, without its header """
+        data_file = io.TextIOWrapper(io.BytesIO(raw), encoding='utf-8')
+        csv_reader = csv.reader(data_file, delimiter=',')
+        next(csv_reader, None)
+        for row in csv_reader:
+            if row:
+                yield row
+
+    def _read_xlsx_rows(self, raw):
+        """ Lazily yield the rows of the first sheet of a XLSX file, without its header """
+        if openpyxl:
+            workbook = openpyxl.load_workbook(io.BytesIO(raw), read_only=True, data_only=True)
+            try:
+                rows = workbook.worksheets[0].iter_rows(min_row=2, values_only=True)
+                for row in rows:
+                    yield [
+                        value.strftime('%Y-%m-%d') if isinstance(value, (datetime, date)) else
+                        '' if value is None else str(value)
+                        for value in row
+                    ]
+            finally:
+                workbook.close()
+        else:
+            sheet = xlrd.open_workbook(file_contents=raw).sheet_by_index(0)
+            for row_no in range(1, sheet.nrows):
+                yield [str(cell.value) for cell in sheet.row(row_no)]
+
+    def _create_statement_from_rows(self, rows, batch_size=1000):
+        """ Create a statement from the rows (date, payment reference, reference, partner,
+            amount, currency) of an imported file. Rows are consumed in batches: partner
+            names and currency codes not seen yet in the file are resolved with one search
+            each and the statement lines of the batch are created at once.
+        """
+        journal_id = self.env.context.get('active_id')
+        StatementLine = self.env['account.bank.statement.line']
+        partner_ids = {}
+        currency_ids = {}
+        statement = False
+        for batch in split_every(batch_size, rows, list):
+            partner_ids.update(self._get_partner_ids({row[3] for row in batch} - partner_ids.keys()))
+            currency_ids.update(self._get_currency_ids({row[5] for row in batch} - currency_ids.keys()))
+            if not statement:
+                statement = self.create_statement({
+                    'name': 'Statement Of ' + str(datetime.today().date()),
+                    'journal_id': journal_id,
+                })
+            StatementLine.create([{
+                'date': row[0],
+                'payment_ref': row[1],
+                'ref': row[2],
+                'partner_id': partner_ids[row[3]],
+                'amount': row[4],
+                'currency_id': currency_ids[row[5]],
+                'journal_id': journal_id,
+                'statement_id': statement.id,
+            } for row in batch])
+        return statement
+
     def import_file(self):
-        for data_file in self.attachment_ids:
-            file_name = data_file.name.lower()
+        tabular_files = self.attachment_ids.filtered(
+            lambda attachment: attachment.name.lower().strip().endswith(('.csv', '.xlsx')))
+        if tabular_files and tabular_files != self.attachment_ids:
+            raise UserError(_("CSV/XLSX files and bank statement files (OFX, CAMT.053, MT940...) "
+                              "can not be imported together, please import them separately."))
+        if not tabular_files:
+            # OFX, CAMT.053, MT940... go through the parser registry
+            return self._import_parsed_files()
+        for data_file in tabular_files:
+            file_name = data_file.name.lower().strip()
             try:
-                if file_name.strip().endswith('.csv') or file_name.strip().endswith('.xlsx'):
-                    statement = False
-                    if file_name.strip().endswith('.csv'):
-                        keys = ['date', 'payment_ref', 'partner_id', 'amount', 'currency_id']
-                        try:
-                            csv_data = base64.b64decode(data_file.datas)
-                            data_file = io.StringIO(csv_data.decode("utf-8"))
-                            data_file.seek(0)
-                            file_reader = []
-                            values = {}
-                            csv_reader = csv.reader(data_file, delimiter=',')
-                            file_reader.extend(csv_reader)
-                        except:
-                            raise UserError(_("Invalid file!"))
-                        vals_list = []
-                        date = False
-                        for i in range(len(file_reader)):
-                            field = list(map(str, file_reader[i]))
-                            values = dict(zip(keys, field))
-                            if values:
-                                if i == 0:
-                                    continue
-                                else:
-                                    if not date:
-                                        date = field[0]
-                                    values.update({
-                                        'date': field[0],
-                                        'payment_ref': field[1],
-                                        'ref': field[2],
-                                        'partner_id': self.get_partner(field[3]),
-                                        'amount': field[4],
-                                        'currency_id':  self.get_currency(field[5]),
-                                        'journal_id': self.env.context.get('active_id')
-                                    })
-                                    vals_list.append((0, 0, values))
-                        statement_vals = {
-                            'name': 'Statement Of ' + str(datetime.today().date()),
-                            'journal_id': self.env.context.get('active_id'),
-                            'line_ids': vals_list
-                        }
-                        if len(vals_list) != 0:
-                            statement = self.create_statement(statement_vals)
-                    elif file_name.strip().endswith('.xlsx'):
-                        try:
-                            fp = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
-                            fp.write(binascii.a2b_base64(data_file.datas))
-                            fp.seek(0)
-                            values = {}
-                            workbook = xlrd.open_workbook(fp.name)
-                            sheet = workbook.sheet_by_index(0)
-                        except:
-                            raise UserError(_("Invalid file!"))
-                        vals_list = []
-                        for row_no in range(sheet.nrows):
-                            val = {}
-                            values = {}
-                            if row_no <= 0:
-                                fields = map(lambda row: row.value.encode('utf-8'), sheet.row(row_no))
-                            else:
-                                line = list(map(
-                                    lambda row: isinstance(row.value, bytes) and row.value.encode('utf-8') or str(
-                                        row.value), sheet.row(row_no)))
-                                values.update({
-                                    'date': line[0],
-                                    'payment_ref': line[1],
-                                    'ref': line[2],
-                                    'partner_id': self.get_partner(line[3]),
-                                    'amount': line[4],
-                                    'currency_id': self.get_currency(line[5]),
-                                    'journal_id': self.env.context.get('active_id')
-                                })
-                                vals_list.append((0, 0, values))
-                        statement_vals = {
-                            'name': 'Statement Of ' + str(datetime.today().date()),
-                            'journal_id': self.env.context.get('active_id'),
-                            'line_ids': vals_list
-                        }
-                        if len(vals_list) != 0:
-                            statement = self.create_statement(statement_vals)
-                    if statement:
-                        return {
-                            'type': 'ir.actions.act_window',
-                            'res_model': 'account.bank.statement',
-                            'view_mode': 'form',
-                            'res_id': statement.id,
-                            'views': [(False, 'form')],
-                        }
+                if file_name.endswith('.csv'):
+                    rows = self._read_csv_rows(data_file.raw)
                 else:
-                    raise ValidationError(_("Unsupported File Type"))
+                    rows = self._read_xlsx_rows(data_file.raw)
+                statement = self._create_statement_from_rows(rows)
+                if statement:
+                    return {
+                        'type': 'ir.actions.act_window',
+                        'res_model': 'account.bank.statement',
+                        'view_mode': 'form',
+                        'res_id': statement.id,
+                        'views': [(False, 'form')],
+                    }
             except Exception as e:
                 raise ValidationError(_("Please upload in specified format ! \n"
                                         "date, payment reference, reference, partner, amount, currency !"))
 
-    # def import_file(self):
-    #     """ Process the file chosen in the wizard, create bank statement(s) and go to reconciliation. """
-    #     self.ensure_one()
-    #     statement_line_ids_all = []
-    #     notifications_all = []
-    #     # Let the appropriate implementation module parse the file and return the required data
-    #     # The active_id is passed in context in case an implementation module requires information about the wizard state (see QIF)
-    #     for data_file in self.attachment_ids:
-    #         currency_code, account_number, stmts_vals = self.with_context(active_id=self.ids[0])._parse_file(base64.b64decode(data_file.datas))
-    #         # Check raw data
-    #         self._check_parsed_data(stmts_vals, account_number)
-    #         # Try to find the currency and journal in odoo
-    #         currency, journal = self._find_additional_data(currency_code, account_number)
-    #         # If no journal found, ask the user about creating one
-    #         if not journal:
-    #             # The active_id is passed in context so the wizard can call import_file again once the journal is created
-    #             return self.with_context(active_id=self.ids[0])._journal_creation_wizard(currency, account_number)
-    #         if not journal.default_debit_account_id or not journal.default_credit_account_id:
-    #             raise UserError(_('You have to set a Default Debit Account and a Default Credit Account for the journal: %s') % (journal.name,))
-    #         # Prepare statement data to be used for bank statements creation
-    #         stmts_vals = self._complete_stmts_vals(stmts_vals, journal, account_number)
-    #         # Create the bank statements
-    #         statement_line_ids, notifications = self._create_bank_statements(stmts_vals)
-    #         statement_line_ids_all.extend(statement_line_ids)
-    #         notifications_all.extend(notifications)
-    #         # Now that the import worked out, set it as the bank_statements_source of the journal
-    #         if journal.bank_statements_source != 'file_import':
-    #             # Use sudo() because only 'account.group_account_manager'
-    #             # has write access on 'account.journal', but 'account.group_account_user'
-    #             # must be able to import bank statement files
-    #             journal.sudo().bank_statements_source = 'file_import'
-    #     # Finally dispatch to reconciliation interface
-    #     return {
-    #         'type': 'ir.actions.client',
-    #         'tag': 'bank_statement_reconciliation_view',
-    #         'context': {'statement_line_ids': statement_line_ids_all,
-    #                     'company_ids': self.env.user.company_ids.ids,
-    #                     'notifications': notifications_all,
-    #         },
-    #     }
+    def _import_parsed_files(self):
+        """ Process the files chosen in the wizard with the registered parsers, create
+            the bank statement(s) and show the imported lines. """
+        self.ensure_one()
+        statement_line_ids_all = []
+        notifications_all = []
+        journal_id = self.env.context.get('journal_id') or self.env.context.get('active_id')
+        self = self.with_context(journal_id=journal_id)
+        for data_file in self.attachment_ids:
+            # The active_id is passed in context in case an implementation module requires information about the wizard state
+            currency_code, account_number, stmts_vals = self.with_context(active_id=self.ids[0])._parse_file(data_file.raw)
+            # Check raw data
+            self._check_parsed_data(stmts_vals, account_number)
+            # Try to find the currency and journal in odoo
+            currency, journal = self._find_additional_data(currency_code, account_number)
+            # If no journal found, ask the user about creating one
+            if not journal:
+                # The active_id is passed in context so the wizard can call import_file again once the journal is created
+                return self.with_context(active_id=self.ids[0])._journal_creation_wizard(currency, account_number)
+            # Prepare statement data to be used for bank statements creation
+            stmts_vals = self._complete_stmts_vals(stmts_vals, journal, account_number)
+            # Create the bank statements
+            statement_line_ids, notifications = self._create_bank_statements(stmts_vals)
+            statement_line_ids_all.extend(statement_line_ids)
+            notifications_all.extend(notifications)
+            # Now that the import worked out, set it as the bank_statements_source of the journal
+            if journal.bank_statements_source != 'file_import':
+                # Use sudo() because only 'account.group_account_manager'
+                # has write access on 'account.journal', but 'account.group_account_user'
+                # must be able to import bank statement files
+                journal.sudo().bank_statements_source = 'file_import'
+        action = {
+            'name': _('Imported Statement Lines'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.bank.statement.line',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', statement_line_ids_all)],
+        }
+        if not notifications_all:
+            return action
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'warning',
+                'message': "\n".join(notification['message'] for notification in notifications_all),
+                'next': action,
+            },
+        }
 
     def _journal_creation_wizard(self, currency, account_number):
         """ Calls a wizard that allows the user to carry on with journal creation """
@@ -211,7 +233,12 @@ class AccountBankStatementImport(models.TransientModel):
         }
 
     def _parse_file(self, data_file):
-
+        """ Parse data_file (bytes) with the first registered parser accepting it, see
+            the parsers package. Return (currency_code, account_number, stmts_vals) where
+            the transactions of each statement may be a generator. """
+        for parser in PARSERS:
+            if parser.matches(data_file):
+                return parser.parse(data_file)
         raise UserError(_('Could not make sense of the given file.\nDid you install the module to support this type of file ?'))
 
     def _check_parsed_data(self, stmts_vals, account_number):
@@ -225,9 +252,17 @@ class AccountBankStatementImport(models.TransientModel):
 
         no_st_line = True
         for vals in stmts_vals:
-            if vals['transactions'] and len(vals['transactions']) > 0:
-                no_st_line = False
-                break
+            transactions = vals['transactions']
+            if not isinstance(transactions, (list, tuple)):
+                # peek the first transaction of the generator and put it back
+                first = next(transactions, None)
+                if first is None:
+                    continue
+                vals['transactions'] = itertools.chain([first], transactions)
+            elif not transactions:
+                continue
+            no_st_line = False
+            break
         if no_st_line:
             raise UserError(
                 _('This file doesn\'t contain any transaction for account %s.') % (account_number,)
@@ -287,6 +322,8 @@ class AccountBankStatementImport(models.TransientModel):
         return currency, journal
 
     def _complete_stmts_vals(self, stmts_vals, journal, account_number):
+        sanitized_account_number = sanitize_account_number(account_number)
+        partner_banks = {}
         for st_vals in stmts_vals:
             st_vals['journal_id'] = journal.id
             if not st_vals.get('reference'):
@@ -295,55 +332,76 @@ class AccountBankStatementImport(models.TransientModel):
                 #build the full name like BNK/2016/00135 by just giving the number '135'
                 st_vals['name'] = journal.sequence_id.with_context(ir_sequence_date=st_vals.get('date')).get_next_char(st_vals['number'])
                 del(st_vals['number'])
-            for line_vals in st_vals['transactions']:
-                unique_import_id = line_vals.get('unique_import_id')
-                if unique_import_id:
-                    sanitized_account_number = sanitize_account_number(account_number)
-                    line_vals['unique_import_id'] = (sanitized_account_number and sanitized_account_number + '-' or '') + str(journal.id) + '-' + unique_import_id
-
-                if not line_vals.get('bank_account_id'):
-                    # Find the partner and his bank account or create the bank account. The partner selected during the
-                    # reconciliation process will be linked to the bank when the statement is closed.
-                    identifying_string = line_vals.get('account_number')
-                    if identifying_string:
-                        partner_bank = self.env['res.partner.bank'].search([('acc_number', '=', identifying_string)], limit=1)
-                        if partner_bank:
-                            line_vals['bank_account_id'] = partner_bank.id
-                            line_vals['partner_id'] = partner_bank.partner_id.id
+            # transactions are completed lazily, as they are consumed
+            st_vals['transactions'] = (
+                self._complete_line_vals(line_vals, journal, sanitized_account_number, partner_banks)
+                for line_vals in st_vals['transactions']
+            )
         return stmts_vals
 
-    def _create_bank_statements(self, stmts_vals):
+    def _complete_line_vals(self, line_vals, journal, sanitized_account_number, partner_banks):
+        unique_import_id = line_vals.get('unique_import_id')
+        if unique_import_id:
+            line_vals['unique_import_id'] = (sanitized_account_number and sanitized_account_number + '-' or '') + str(journal.id) + '-' + unique_import_id
+
+        if not line_vals.get('partner_bank_id'):
+            # Find the partner and his bank account or create the bank account. The partner selected during the
+            # reconciliation process will be linked to the bank when the statement is closed.
+            identifying_string = line_vals.get('account_number')
+            if identifying_string:
+                if identifying_string not in partner_banks:
+                    partner_banks[identifying_string] = self.env['res.partner.bank'].search([('acc_number', '=', identifying_string)], limit=1)
+                partner_bank = partner_banks[identifying_string]
+                if partner_bank:
+                    line_vals['partner_bank_id'] = partner_bank.id
+                    line_vals['partner_id'] = partner_bank.partner_id.id
+        return line_vals
+
+    def _create_bank_statements(self, stmts_vals, batch_size=1000):
         """ Create new bank statements from imported values, filtering out already imported transactions, and returns data used by the reconciliation widget """
         BankStatement = self.env['account.bank.statement']
         BankStatementLine = self.env['account.bank.statement.line']
 
-        # Filter out already imported transactions and create statements
+        # Filter out already imported transactions and create statements.
+        # Transactions are consumed in batches: the import ids of each batch are checked
+        # with one query (backed by the unique index of unique_import_id) instead of one
+        # search per transaction, and its lines are created at once.
         statement_line_ids = []
-        ignored_statement_lines_import_ids = []
+        ignored_statement_line_ids = []
         for st_vals in stmts_vals:
-            filtered_st_lines = []
-            for line_vals in st_vals['transactions']:
-                if 'unique_import_id' not in line_vals \
-                   or not line_vals['unique_import_id'] \
-                   or not bool(BankStatementLine.sudo().search([('unique_import_id', '=', line_vals['unique_import_id'])], limit=1)):
-                    filtered_st_lines.append(line_vals)
-                else:
-                    ignored_statement_lines_import_ids.append(line_vals['unique_import_id'])
-                    if 'balance_start' in st_vals:
-                        st_vals['balance_start'] += float(line_vals['amount'])
-
-            if len(filtered_st_lines) > 0:
-                # Remove values that won't be used to create records
-                st_vals.pop('transactions', None)
-                # Create the statement
-                st_vals['line_ids'] = [[0, False, line] for line in filtered_st_lines]
-                statement_line_ids.extend(BankStatement.create(st_vals).line_ids.ids)
+            transactions = st_vals.pop('transactions', [])
+            statement = False
+            balance_start = st_vals.get('balance_start')
+            for batch in split_every(batch_size, transactions, list):
+                import_ids = [line_vals['unique_import_id'] for line_vals in batch if line_vals.get('unique_import_id')]
+                existing_lines = BankStatementLine.sudo().search([('unique_import_id', 'in', import_ids)]) if import_ids else BankStatementLine
+                existing_import_ids = set(existing_lines.mapped('unique_import_id'))
+                ignored_statement_line_ids.extend(existing_lines.ids)
+
+                filtered_st_lines = []
+                for line_vals in batch:
+                    if not line_vals.get('unique_import_id') \
+                       or line_vals['unique_import_id'] not in existing_import_ids:
+                        filtered_st_lines.append(line_vals)
+                    elif balance_start is not None:
+                        balance_start += float(line_vals['amount'])
+
+                if len(filtered_st_lines) > 0:
+                    # Create the statement
+                    if not statement:
+                        statement = BankStatement.create(st_vals)
+                    statement_line_ids.extend(BankStatementLine.create([
+                        dict(line_vals, statement_id=statement.id, journal_id=statement.journal_id.id)
+                        for line_vals in filtered_st_lines
+                    ]).ids)
+            if statement and balance_start is not None and balance_start != st_vals['balance_start']:
+                statement.balance_start = balance_start
         if len(statement_line_ids) == 0:
             raise UserError(_('You already have imported that file.'))
 
         # Prepare import feedback
         notifications = []
-        num_ignored = len(ignored_statement_lines_import_ids)
+        num_ignored = len(ignored_statement_line_ids)
         if num_ignored > 0:
             notifications += [{
                 'type': 'warning',
@@ -351,7 +409,7 @@ class AccountBankStatementImport(models.TransientModel):
                 'details': {
                     'name': _('Already imported items'),
                     'model': 'account.bank.statement.line',
-                    'ids': BankStatementLine.search([('unique_import_id', 'in', ignored_statement_lines_import_ids)]).ids
+                    'ids': ignored_statement_line_ids
                 }
             }]
         return statement_line_ids, notifications
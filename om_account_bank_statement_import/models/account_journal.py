@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, api, _
+from ..parsers import PARSERS
 
 
 class AccountJournal(models.Model):
@@ -9,7 +10,7 @@ class AccountJournal(models.Model):
     def _get_bank_statements_available_import_formats(self):
         """ Returns a list of strings representing the supported import formats.
         """
-        return []
+        return ['CSV', 'XLSX'] + [parser.name for parser in PARSERS]
 
     def __get_bank_statements_available_sources(self):
         rslt = super(AccountJournal, self).__get_bank_statements_available_sources()
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+from .base import PARSERS, StatementParser, register_parser
+from . import camt
+from . import mt940
+from . import ofx
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+PARSERS = []
+
+
+def register_parser(cls):
+    """ Class decorator adding a parser to the registry used by
+        account.bank.statement.import._parse_file """
+    PARSERS.append(cls())
+    return cls
+
+
+class StatementParser(object):
+    """ Base class of the bank statement file parsers.
+
+        parse() returns the values expected by the import hooks:
+        (currency_code, account_number, stmts_vals). To import big files with
+        bounded memory, the 'transactions' of each statement are generators
+        reading the file incrementally instead of lists.
+    """
+    name = None
+
+    def matches(self, data_file):
+        """ Return whether data_file (bytes) is in the format of this parser """
+        raise NotImplementedError()
+
+    def parse(self, data_file):
+        raise NotImplementedError()
+
+    @staticmethod
+    def to_amount(value):
+        return float(value.strip().replace(',', '.')) if value and value.strip() else 0.0
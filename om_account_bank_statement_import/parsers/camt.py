@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+import io
+from datetime import datetime
+
+from lxml import etree
+
+from .base import StatementParser, register_parser
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else tag
+
+
+def _find(elem, path):
+    """ Namespace agnostic ElementTree find of a child path like 'Acct/Id/IBAN' """
+    for part in path.split('/'):
+        if elem is None:
+            return None
+        elem = next((child for child in elem if _local(child.tag) == part), None)
+    return elem
+
+
+def _text(elem, *paths):
+    for path in paths:
+        node = _find(elem, path)
+        if node is not None and node.text and node.text.strip():
+            return node.text.strip()
+    return None
+
+
+def _release(elem):
+    """ Clear a parsed element and detach it, with the already parsed siblings
+        of the same tag before it, so the tree does not keep empty shells """
+    elem.clear()
+    parent = elem.getparent()
+    if parent is None:
+        return
+    previous = elem.getprevious()
+    while previous is not None and previous.tag == elem.tag:
+        parent.remove(previous)
+        previous = elem.getprevious()
+
+
+def _date(value):
+    return datetime.strptime(value[:10], '%Y-%m-%d').date() if value else False
+
+
+@register_parser
+class CamtParser(StatementParser):
+    """ ISO 20022 CAMT.053 (bank to customer statement), read with iterparse.
+        Entries are cleared and detached as soon as they are read so the tree
+        never holds more than one of them. """
+    name = 'CAMT.053'
+
+    def matches(self, data_file):
+        return b'camt.053' in data_file[:4096]
+
+    def _iterparse(self, data_file, events=('end',)):
+        return etree.iterparse(
+            io.BytesIO(data_file), events=events, resolve_entities=False, no_network=True)
+
+    def _signed_amount(self, elem):
+        amount = self.to_amount(_text(elem, 'Amt'))
+        return -amount if _text(elem, 'CdtDbtInd') == 'DBIT' else amount
+
+    def _get_balance(self, stmt, codes):
+        for bal in stmt:
+            if _local(bal.tag) == 'Bal' and _text(bal, 'Tp/CdOrPrtry/Cd') in codes:
+                return self._signed_amount(bal)
+        return None
+
+    def parse(self, data_file):
+        stmts_vals = []
+        currency_code = account_number = None
+        index = 0
+        for event, elem in self._iterparse(data_file):
+            tag = _local(elem.tag)
+            if tag == 'Ntry':
+                _release(elem)
+            elif tag == 'Stmt':
+                if account_number is None:
+                    account_number = _text(elem, 'Acct/Id/IBAN', 'Acct/Id/Othr/Id')
+                    currency_code = _text(elem, 'Acct/Ccy')
+                    if not currency_code:
+                        amount = _find(elem, 'Bal/Amt')
+                        currency_code = amount.get('Ccy') if amount is not None else None
+                balance_end = self._get_balance(elem, ('CLBD',))
+                stmts_vals.append({
+                    'name': _text(elem, 'Id') or '',
+                    'date': _date(_text(elem, 'CreDtTm', 'FrToDt/ToDtTm')),
+                    'balance_start': self._get_balance(elem, ('OPBD', 'PRCD')) or 0.0,
+                    'balance_end_real': balance_end or 0.0,
+                    'transactions': self._iter_entries(data_file, index),
+                })
+                index += 1
+                _release(elem)
+        return currency_code, account_number, stmts_vals
+
+    def _iter_entries(self, data_file, stmt_index):
+        index = -1
+        for event, elem in self._iterparse(data_file, events=('start', 'end')):
+            tag = _local(elem.tag)
+            if tag == 'Stmt':
+                if event == 'start':
+                    index += 1
+                elif index == stmt_index:
+                    return
+                else:
+                    _release(elem)
+            elif tag == 'Ntry' and event == 'end':
+                if index == stmt_index:
+                    yield self._get_transaction(elem)
+                _release(elem)
+
+    def _get_transaction(self, entry):
+        amount = self._signed_amount(entry)
+        tx = _find(entry, 'NtryDtls/TxDtls')
+        party = 'Dbtr' if amount > 0 else 'Cdtr'
+        ref = _text(entry, 'AcctSvcrRef', 'NtryRef')
+        vals = {
+            'date': _date(_text(entry, 'BookgDt/Dt', 'BookgDt/DtTm', 'ValDt/Dt', 'ValDt/DtTm')),
+            'amount': amount,
+            'ref': ref or '',
+            'payment_ref': _text(entry, 'AddtlNtryInf') or '/',
+            'unique_import_id': ref,
+        }
+        if tx is not None:
+            vals['payment_ref'] = _text(tx, 'RmtInf/Ustrd', 'AddtlTxInf') or vals['payment_ref']
+            vals['partner_name'] = _text(tx, 'RltdPties/%s/Nm' % party, 'RltdPties/%s/Pty/Nm' % party)
+            vals['account_number'] = _text(
+                tx, 'RltdPties/%sAcct/Id/IBAN' % party, 'RltdPties/%sAcct/Id/Othr/Id' % party)
+            tx_ref = _text(tx, 'Refs/AcctSvcrRef', 'Refs/EndToEndId')
+            if not ref and tx_ref:
+                vals['unique_import_id'] = tx_ref
+        return vals
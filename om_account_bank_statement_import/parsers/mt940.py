@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import io
+import re
+from datetime import datetime
+
+from .base import StatementParser, register_parser
+
+FIELD_RE = re.compile(r'^:(\d{2}[A-Z]?):(.*)$')
+BALANCE_RE = re.compile(r'^([CD])(\d{6})([A-Z]{3})([\d,]+)')
+LINE_RE = re.compile(
+    r'^(?P<value_date>\d{6})(?P<entry_date>\d{4})?(?P<sign>R?[CD])[A-Z]?(?P<amount>[\d,]+)'
+    r'(?P<type>[A-Z0-9]{4})(?P<customer_ref>[^/\n]*)(//(?P<bank_ref>[^\n]*))?(\n(?P<details>.*))?',
+    re.DOTALL)
+
+
+def _date(value):
+    return datetime.strptime(value, '%y%m%d').date()
+
+
+@register_parser
+class Mt940Parser(StatementParser):
+    """ SWIFT MT940, read line by line. """
+    name = 'MT940'
+
+    def matches(self, data_file):
+        head = data_file[:4096]
+        return b':20:' in head and b':25:' in head
+
+    def _iter_fields(self, data_file):
+        """ Yield the (tag, value) fields of the file, joining continuation lines """
+        tag = value = None
+        for line in io.TextIOWrapper(io.BytesIO(data_file), encoding='latin-1'):
+            line = line.rstrip('\r\n')
+            match = FIELD_RE.match(line)
+            if match:
+                if tag:
+                    yield tag, value
+                tag, value = match.groups()
+            elif tag and line and line != '-' and not line.startswith('-}'):
+                value += '\n' + line
+        if tag:
+            yield tag, value
+
+    def _balance(self, value):
+        match = BALANCE_RE.match(value)
+        if not match:
+            return 0.0, None, False
+        sign, date, currency, amount = match.groups()
+        amount = self.to_amount(amount)
+        return (-amount if sign == 'D' else amount), currency, _date(date)
+
+    def parse(self, data_file):
+        stmts_vals = []
+        currency_code = account_number = None
+        for tag, value in self._iter_fields(data_file):
+            if tag == '20':
+                st_vals = {
+                    'name': value.strip(),
+                    'balance_start': 0.0,
+                    'balance_end_real': 0.0,
+                    'transactions': self._iter_transactions(data_file, len(stmts_vals)),
+                }
+                stmts_vals.append(st_vals)
+            elif not stmts_vals:
+                continue
+            elif tag == '25' and account_number is None:
+                account_number = value.strip().split('/')[-1]
+            elif tag in ('60F', '60M'):
+                st_vals['balance_start'], currency, balance_date = self._balance(value)
+                currency_code = currency_code or currency
+            elif tag in ('62F', '62M'):
+                st_vals['balance_end_real'], currency, st_vals['date'] = self._balance(value)
+        return currency_code, account_number, stmts_vals
+
+    def _iter_transactions(self, data_file, stmt_index):
+        index = -1
+        vals = None
+        for tag, value in self._iter_fields(data_file):
+            if tag == '20':
+                index += 1
+                if index > stmt_index:
+                    break
+            if index != stmt_index:
+                continue
+            if tag == '61':
+                if vals:
+                    yield self._set_import_id(vals)
+                vals = self._get_transaction(value)
+            elif tag == '86' and vals:
+                vals['payment_ref'] = ' '.join(value.split()) or vals['payment_ref']
+                vals['details'] = value
+            elif tag.startswith('62') and vals:
+                yield self._set_import_id(vals)
+                vals = None
+        if vals:
+            yield self._set_import_id(vals)
+
+    def _get_transaction(self, value):
+        match = LINE_RE.match(value)
+        if not match:
+            return None
+        amount = self.to_amount(match.group('amount'))
+        if match.group('sign') in ('D', 'RC'):
+            amount = -amount
+        customer_ref = match.group('customer_ref').strip()
+        bank_ref = (match.group('bank_ref') or '').strip()
+        return {
+            'date': _date(match.group('value_date')),
+            'amount': amount,
+            'ref': customer_ref if customer_ref != 'NONREF' else bank_ref,
+            'payment_ref': (match.group('details') or '').strip() or customer_ref or '/',
+            'unique_import_id': bank_ref,
+            'line': value,
+        }
+
+    def _set_import_id(self, vals):
+        """ Without bank reference, identify the transaction by its own data
+            (the :61: line and the :86: details), so the same transaction gets
+            the same id whatever its position in the file """
+        line = vals.pop('line')
+        details = vals.pop('details', '')
+        if not vals['unique_import_id']:
+            digest = hashlib.sha1(
+                ('%s\n%s' % (' '.join(line.split()), ' '.join(details.split()))).encode()
+            ).hexdigest()
+            vals['unique_import_id'] = '%s-%s-%s' % (vals['date'], vals['amount'], digest[:16])
+        return vals
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import re
+from datetime import datetime
+
+from .base import StatementParser, register_parser
+
+# Works for both OFX 1.x (SGML, closing tags optional) and 2.x (XML)
+TAG_RE = re.compile(r'<(/?)([A-Z0-9.]+)>([^<]*)')
+
+
+def _date(value):
+    return datetime.strptime(value[:8], '%Y%m%d').date() if value else False
+
+
+@register_parser
+class OfxParser(StatementParser):
+    """ OFX bank statements, read tag by tag. """
+    name = 'OFX'
+
+    def matches(self, data_file):
+        head = data_file[:4096]
+        return b'OFXHEADER' in head or b'<OFX>' in head
+
+    def _decode(self, data_file):
+        try:
+            return data_file.decode('utf-8')
+        except UnicodeDecodeError:
+            return data_file.decode('latin-1')
+
+    def _iter_tags(self, text):
+        for match in TAG_RE.finditer(text):
+            closing, tag, value = match.groups()
+            yield ('/' + tag) if closing else tag, value.strip()
+
+    def parse(self, data_file):
+        text = self._decode(data_file)
+        stmts_vals = []
+        currency_code = account_number = None
+        st_vals = None
+        section = None
+        total = 0.0
+        for tag, value in self._iter_tags(text):
+            if tag == 'STMTRS':
+                st_vals = {
+                    'name': '',
+                    'transactions': self._iter_transactions(text, len(stmts_vals)),
+                }
+                stmts_vals.append(st_vals)
+                total = 0.0
+            elif st_vals is None:
+                continue
+            elif tag in ('LEDGERBAL', 'BANKACCTFROM'):
+                section = tag
+            elif tag == 'CURDEF' and not currency_code:
+                currency_code = value
+            elif tag == 'ACCTID' and section == 'BANKACCTFROM' and account_number is None:
+                account_number = value
+            elif tag == 'TRNAMT':
+                total += self.to_amount(value)
+            elif tag == 'BALAMT' and section == 'LEDGERBAL':
+                st_vals['balance_end_real'] = self.to_amount(value)
+                st_vals['balance_start'] = st_vals['balance_end_real'] - total
+            elif tag == 'DTASOF' and section == 'LEDGERBAL':
+                st_vals['date'] = _date(value)
+            elif tag == 'DTEND' and not st_vals.get('date'):
+                st_vals['date'] = _date(value)
+        return currency_code, account_number, stmts_vals
+
+    def _iter_transactions(self, text, stmt_index):
+        index = -1
+        vals = None
+        for tag, value in self._iter_tags(text):
+            if tag == 'STMTRS':
+                index += 1
+                if index > stmt_index:
+                    break
+            if index != stmt_index:
+                continue
+            if tag == 'STMTTRN':
+                vals = {'payment_ref': '/', 'ref': ''}
+            elif tag in ('/STMTTRN', '/BANKTRANLIST') and vals:
+                yield vals
+                vals = None
+            elif vals is None:
+                continue
+            elif tag == 'TRNAMT':
+                vals['amount'] = self.to_amount(value)
+            elif tag == 'DTPOSTED':
+                vals['date'] = _date(value)
+            elif tag == 'FITID':
+                vals['unique_import_id'] = value
+            elif tag == 'NAME':
+                vals['partner_name'] = value
+                vals['payment_ref'] = value
+            elif tag == 'MEMO' and value:
+                vals['payment_ref'] = '%s %s' % (vals.get('partner_name', ''), value) if vals.get('partner_name') else value
+            elif tag in ('CHECKNUM', 'REFNUM') and value:
+                vals['ref'] = value
@@ -15,6 +15,7 @@
     'data': [
         'security/ir.model.access.csv',
         'security/account_budget_security.xml',
+        'data/ir_cron_data.xml',
         'views/account_analytic_account_views.xml',
         'views/account_budget_views.xml',
         'views/res_config_settings_views.xml',
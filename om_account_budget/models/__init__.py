@@ -3,3 +3,5 @@
 
 from . import account_budget
 from . import account_analytic_account
+from . import account_move_line
+from . import account_analytic_line
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, models
+
+BUDGET_ANALYTIC_LINE_FIELDS = {'account_id', 'general_account_id', 'date', 'amount'}
+
+
+class AccountAnalyticLine(models.Model):
+    _inherit = "account.analytic.line"
+
+    def _update_budget_practical_amount(self):
+        """ Schedule the recomputation of the budget lines based on the analytic items of self """
+        dates = [date for date in self.mapped('date') if date]
+        if not dates or not self.account_id:
+            return
+        self.env['crossovered.budget.lines']._mark_practical_amount_to_compute([
+            ('analytic_account_id', 'in', self.account_id.ids),
+            ('date_from', '<=', max(dates)),
+            ('date_to', '>=', min(dates)),
+        ])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super(AccountAnalyticLine, self).create(vals_list)
+        lines._update_budget_practical_amount()
+        return lines
+
+    def write(self, vals):
+        if BUDGET_ANALYTIC_LINE_FIELDS.isdisjoint(vals):
+            return super(AccountAnalyticLine, self).write(vals)
+        self._update_budget_practical_amount()
+        res = super(AccountAnalyticLine, self).write(vals)
+        self._update_budget_practical_amount()
+        return res
+
+    def unlink(self):
+        self._update_budget_practical_amount()
+        return super(AccountAnalyticLine, self).unlink()
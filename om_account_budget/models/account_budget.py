@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from datetime import timedelta
+
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
+from odoo.tools import split_every
 
 # ---------------------------------------------------------
 # Budgets
@@ -91,13 +94,19 @@ class CrossoveredBudgetLines(models.Model):
         'Planned Amount', required=True,
         help="Amount you plan to earn/spend. Record a positive amount if it is a revenue and a negative amount if it is a cost.")
     practical_amount = fields.Monetary(
-        compute='_compute_practical_amount', string='Practical Amount', help="Amount really earned/spent.")
+        compute='_compute_practical_amount', string='Practical Amount', store=True, index=True,
+        help="Amount really earned/spent.")
     theoritical_amount = fields.Monetary(
         compute='_compute_theoritical_amount', string='Theoretical Amount',
         help="Amount you are supposed to have earned/spent at this date.")
     percentage = fields.Float(
         compute='_compute_percentage', string='Achievement',
         help="Comparison between practical and theoretical amount. This measure tells you if you are below or over budget.")
+    variance = fields.Monetary(
+        compute='_compute_variance', string='Variance', store=True, index=True,
+        help="Difference between the practical and the theoretical amount, stored so budget lines "
+             "can be filtered and sorted by it. Refreshed every day by the "
+             "'Budget: Reconcile Practical Amounts' scheduled action for the running lines.")
     company_id = fields.Many2one(related='crossovered_budget_id.company_id', comodel_name='res.company',
         string='Company', store=True, readonly=True)
     is_above_budget = fields.Boolean(compute='_is_above_budget')
@@ -108,37 +117,29 @@ class CrossoveredBudgetLines(models.Model):
         # overrides the default read_group in order to compute the computed fields manually for the group
         fields_list = {'practical_amount', 'theoritical_amount', 'percentage'}
         fields = {field.split(':', 1)[0] if field.split(':', 1)[0] in fields_list else field for field in fields}
-        result = super(CrossoveredBudgetLines, self).read_group(domain, fields, groupby, offset=offset, limit=limit,
-                                                                orderby=orderby, lazy=lazy)
-        if any(x in fields for x in fields_list):
-            for group_line in result:
-
-                # initialise fields to compute to 0 if they are requested
-                if 'practical_amount' in fields:
-                    group_line['practical_amount'] = 0
-                if 'theoritical_amount' in fields:
-                    group_line['theoritical_amount'] = 0
-                if 'percentage' in fields:
-                    group_line['percentage'] = 0
-                    group_line['practical_amount'] = 0
-                    group_line['theoritical_amount'] = 0
-
-                if group_line.get('__domain'):
-                    all_budget_lines_that_compose_group = self.search(group_line['__domain'])
-                else:
-                    all_budget_lines_that_compose_group = self.search([])
-                for budget_line_of_group in all_budget_lines_that_compose_group:
-                    if 'practical_amount' in fields or 'percentage' in fields:
-                        group_line['practical_amount'] += budget_line_of_group.practical_amount
-
-                    if 'theoritical_amount' in fields or 'percentage' in fields:
-                        group_line['theoritical_amount'] += budget_line_of_group.theoritical_amount
-
-                    if 'percentage' in fields:
-                        if group_line['theoritical_amount']:
-                            # use a weighted average
-                            group_line['percentage'] = float(
-                                (group_line['practical_amount'] or 0.0) / group_line['theoritical_amount']) * 100
+        if not any(x in fields for x in ('theoritical_amount', 'percentage')):
+            return super(CrossoveredBudgetLines, self).read_group(domain, fields, groupby, offset=offset, limit=limit,
+                                                                  orderby=orderby, lazy=lazy)
+
+        # the practical amount is stored and summed by the query itself; the theoretical
+        # amount depends on today's date, so fetch the ids of the lines of every group in
+        # the same query and aggregate the values computed for all of them at once
+        result = super(CrossoveredBudgetLines, self).read_group(
+            domain, list(fields - {'theoritical_amount', 'percentage'}) + ['practical_amount', 'budget_line_ids:array_agg(id)'],
+            groupby, offset=offset, limit=limit, orderby=orderby, lazy=lazy)
+        lines = self.browse({line_id for group_line in result for line_id in group_line['budget_line_ids']})
+        theoritical_amounts = dict(zip(lines.ids, lines.mapped('theoritical_amount')))
+        for group_line in result:
+            line_ids = group_line.pop('budget_line_ids')
+
+            # aggregate the requested fields over the lines of the group
+            group_line['theoritical_amount'] = sum(theoritical_amounts[line_id] for line_id in line_ids)
+            if 'percentage' in fields:
+                group_line['percentage'] = 0
+                if group_line['theoritical_amount']:
+                    # use a weighted average
+                    group_line['percentage'] = float(
+                        (group_line['practical_amount'] or 0.0) / group_line['theoritical_amount']) * 100
 
         return result
 
@@ -159,39 +160,97 @@ class CrossoveredBudgetLines(models.Model):
                 computed_name += ' - ' + line.analytic_account_id.name
             line.name = computed_name
 
+    @api.depends('analytic_account_id', 'general_budget_id.account_ids', 'date_from', 'date_to')
     def _compute_practical_amount(self):
+        # computed for all the lines at once: one grouped query for the lines with an
+        # analytic account and one for the lines based on journal items. The amounts are
+        # kept up to date by the journal and analytic items, see _mark_practical_amount_to_compute
+        lines = self.filtered('id')
+        amounts = {}
+        if lines:
+            self.flush_model(['analytic_account_id', 'general_budget_id', 'date_from', 'date_to'])
+            self.env['account.budget.post'].flush_model(['account_ids'])
+            analytic_lines = lines.filtered('analytic_account_id')
+            if analytic_lines:
+                amounts.update(analytic_lines._get_practical_amounts_from_analytic_lines())
+            if analytic_lines != lines:
+                amounts.update((lines - analytic_lines)._get_practical_amounts_from_move_lines())
         for line in self:
-            acc_ids = line.general_budget_id.account_ids.ids
-            date_to = line.date_to
-            date_from = line.date_from
-            if line.analytic_account_id.id:
-                analytic_line_obj = self.env['account.analytic.line']
-                domain = [('account_id', '=', line.analytic_account_id.id),
-                          ('date', '>=', date_from),
-                          ('date', '<=', date_to),
-                          ]
-                if acc_ids:
-                    domain += [('general_account_id', 'in', acc_ids)]
-
-                where_query = analytic_line_obj._where_calc(domain)
-                analytic_line_obj._apply_ir_rules(where_query, 'read')
-                from_clause, where_clause, where_clause_params = where_query.get_sql()
-                select = "SELECT SUM(amount) from " + from_clause + " where " + where_clause
+            line.practical_amount = amounts.get(line.id) or 0.0
+
+    def _get_practical_amounts_query(self, model):
+        """ FROM and WHERE parts (with the record rules applied) of the query on model """
+        obj = self.env[model]
+        where_query = obj._where_calc([])
+        obj._apply_ir_rules(where_query, 'read')
+        from_clause, where_clause, where_clause_params = where_query.get_sql()
+        return from_clause, where_clause and ' AND ' + where_clause or '', where_clause_params
+
+    def _get_practical_amounts_from_analytic_lines(self):
+        self.env['account.analytic.line'].flush_model(['account_id', 'general_account_id', 'date', 'amount'])
+        from_clause, where_clause, where_clause_params = self._get_practical_amounts_query('account.analytic.line')
+        self.env.cr.execute("""
+            SELECT bl.id, SUM("account_analytic_line".amount)
+            FROM crossovered_budget_lines bl, """ + from_clause + """
+            WHERE bl.id IN %s
+            AND "account_analytic_line".account_id = bl.analytic_account_id
+            AND "account_analytic_line".date >= bl.date_from
+            AND "account_analytic_line".date <= bl.date_to
+            AND (
+                NOT EXISTS (SELECT 1 FROM account_budget_rel rel WHERE rel.budget_id = bl.general_budget_id)
+                OR "account_analytic_line".general_account_id IN (
+                    SELECT rel.account_id FROM account_budget_rel rel WHERE rel.budget_id = bl.general_budget_id)
+            )""" + where_clause + """
+            GROUP BY bl.id
+        """, [tuple(self.ids)] + where_clause_params)
+        return dict(self.env.cr.fetchall())
+
+    def _get_practical_amounts_from_move_lines(self):
+        self.env['account.move.line'].flush_model(['account_id', 'date', 'credit', 'debit'])
+        from_clause, where_clause, where_clause_params = self._get_practical_amounts_query('account.move.line')
+        self.env.cr.execute("""
+            SELECT bl.id, SUM("account_move_line".credit) - SUM("account_move_line".debit)
+            FROM crossovered_budget_lines bl
+            JOIN account_budget_rel rel ON rel.budget_id = bl.general_budget_id, """ + from_clause + """
+            WHERE bl.id IN %s
+            AND "account_move_line".account_id = rel.account_id
+            AND "account_move_line".date >= bl.date_from
+            AND "account_move_line".date <= bl.date_to""" + where_clause + """
+            GROUP BY bl.id
+        """, [tuple(self.ids)] + where_clause_params)
+        return dict(self.env.cr.fetchall())
 
-            else:
-                aml_obj = self.env['account.move.line']
-                domain = [('account_id', 'in',
-                           line.general_budget_id.account_ids.ids),
-                          ('date', '>=', date_from),
-                          ('date', '<=', date_to)
-                          ]
-                where_query = aml_obj._where_calc(domain)
-                aml_obj._apply_ir_rules(where_query, 'read')
-                from_clause, where_clause, where_clause_params = where_query.get_sql()
-                select = "SELECT sum(credit)-sum(debit) from " + from_clause + " where " + where_clause
-
-            self.env.cr.execute(select, where_clause_params)
-            line.practical_amount = self.env.cr.fetchone()[0] or 0.0
+    @api.model
+    def _mark_practical_amount_to_compute(self, domain):
+        """ Schedule the recomputation of the practical amount of the lines matching domain """
+        lines = self.sudo().with_context(active_test=False).search(domain)
+        if lines:
+            self.env.add_to_compute(self._fields['practical_amount'], lines)
+
+    @api.model
+    def _cron_reconcile_practical_amount(self, batch_size=1000):
+        """ Recompute the stored practical amounts from the ledger, in case any of them
+        drifted (e.g. after journal or analytic items were changed directly in SQL), and
+        the variance of the lines whose theoretical amount changes with today's date """
+        field = self._fields['practical_amount']
+        for line_ids in split_every(batch_size, self.search([]).ids):
+            lines = self.browse(line_ids)
+            self.env.add_to_compute(field, lines)
+            lines.flush_recordset(['practical_amount', 'variance'])
+            self.env.invalidate_all()
+
+        today = fields.Date.today()
+        yesterday = today - timedelta(days=1)
+        field = self._fields['variance']
+        running_lines = self.search([
+            '|', '&', ('paid_date', '=', False), '&', ('date_from', '<=', today), ('date_to', '>=', yesterday),
+            ('paid_date', '=', yesterday),
+        ])
+        for line_ids in split_every(batch_size, running_lines.ids):
+            lines = self.browse(line_ids)
+            self.env.add_to_compute(field, lines)
+            lines.flush_recordset(['variance'])
+            self.env.invalidate_all()
 
     def _compute_theoritical_amount(self):
         # beware: 'today' variable is mocked in the python tests and thus, its implementation matter
@@ -223,6 +282,11 @@ class CrossoveredBudgetLines(models.Model):
             else:
                 line.percentage = 0.00
 
+    @api.depends('practical_amount', 'planned_amount', 'date_from', 'date_to', 'paid_date')
+    def _compute_variance(self):
+        for line in self:
+            line.variance = line.practical_amount - line.theoritical_amount
+
     @api.constrains('general_budget_id', 'analytic_account_id')
     def _must_have_analytical_or_budgetary_or_both(self):
         if not self.analytic_account_id and not self.general_budget_id:
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, models
+
+# values whose change may change the account, date or balance of journal items,
+# directly or through their computation
+BUDGET_MOVE_LINE_FIELDS = {
+    'account_id', 'date', 'debit', 'credit', 'balance', 'amount_currency', 'currency_id',
+    'price_unit', 'quantity', 'discount', 'tax_ids', 'product_id', 'move_id',
+}
+BUDGET_MOVE_FIELDS = {'line_ids', 'invoice_line_ids', 'date', 'currency_id', 'invoice_date'}
+
+
+class AccountMoveLine(models.Model):
+    _inherit = "account.move.line"
+
+    def _get_budget_values(self):
+        """ Return {line id: (account id, date, balance)}, what the budget lines depend on """
+        return {line.id: (line.account_id.id, line.date, line.balance) for line in self}
+
+    def _mark_budget_practical_amount(self, values):
+        """ Schedule the recomputation of the budget lines based on journal items with the
+        given (account id, date, balance) values """
+        values = [value for value in values if value[0] and value[1]]
+        if not values:
+            return
+        dates = [value[1] for value in values]
+        self.env['crossovered.budget.lines']._mark_practical_amount_to_compute([
+            ('analytic_account_id', '=', False),
+            ('general_budget_id.account_ids', 'in', list({value[0] for value in values})),
+            ('date_from', '<=', max(dates)),
+            ('date_to', '>=', min(dates)),
+        ])
+
+    def _update_budget_practical_amount(self, old_values=None):
+        """ Schedule the recomputation of the budget lines based on the journal items of self.
+        With old_values (as returned by _get_budget_values before a change), only the items
+        whose account, date or balance changed are considered, with their old and new values.
+        The balance is computed from the price, quantity, taxes, currency... of the items, so
+        comparing it catches the changes made without writing it directly. """
+        new_values = self._get_budget_values()
+        if old_values is None:
+            self._mark_budget_practical_amount(new_values.values())
+            return
+        changed = [line_id for line_id, value in new_values.items() if old_values.get(line_id) != value]
+        self._mark_budget_practical_amount(
+            [new_values[line_id] for line_id in changed]
+            + [old_values[line_id] for line_id in changed if line_id in old_values])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super(AccountMoveLine, self).create(vals_list)
+        lines._update_budget_practical_amount()
+        return lines
+
+    def write(self, vals):
+        if BUDGET_MOVE_LINE_FIELDS.isdisjoint(vals):
+            return super(AccountMoveLine, self).write(vals)
+        old_values = self._get_budget_values()
+        res = super(AccountMoveLine, self).write(vals)
+        self._update_budget_practical_amount(old_values)
+        return res
+
+    def unlink(self):
+        self._update_budget_practical_amount()
+        return super(AccountMoveLine, self).unlink()
+
+
+class AccountMove(models.Model):
+    _inherit = "account.move"
+
+    def write(self, vals):
+        # changing the entry (date, currency, lines...) may change the journal items
+        # without writing on them
+        if BUDGET_MOVE_FIELDS.isdisjoint(vals):
+            return super(AccountMove, self).write(vals)
+        lines = self.line_ids
+        old_values = lines._get_budget_values()
+        res = super(AccountMove, self).write(vals)
+        lines.exists()._update_budget_practical_amount(old_values)
+        return res
@@ -14,6 +14,7 @@
         'security/security.xml',
         'security/ir.model.access.csv',
         'data/data.xml',
+        'data/ir_cron_data.xml',
         'wizard/followup_print_view.xml',
         'wizard/followup_results_view.xml',
         'views/followup_view.xml',
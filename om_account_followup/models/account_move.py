@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import api, fields, models, _
+from odoo.tools import create_index
 
 
 class AccountMoveLine(models.Model):
@@ -10,6 +11,13 @@ class AccountMoveLine(models.Model):
     followup_date = fields.Date('Latest Follow-up')
     result = fields.Float(compute='_get_result', string="Balance Amount")
 
+    def init(self):
+        super().init()
+        # open receivable lines aggregated by the follow-up partner searches
+        create_index(self._cr, 'account_move_line_followup_open_idx', self._table,
+                     ['company_id', 'partner_id', 'account_id', 'date_maturity'],
+                     where='full_reconcile_id IS NULL AND partner_id IS NOT NULL')
+
     def _get_result(self):
         for aml in self:
             aml.result = aml.debit - aml.credit
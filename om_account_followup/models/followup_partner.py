@@ -26,9 +26,11 @@ class FollowupStatByPartner(models.Model):
 
     @api.model
     def init(self):
+        # materialized, so that the follow-up screens do not aggregate all the
+        # open receivable lines on every access; see _refresh
         tools.drop_view_if_exists(self._cr, 'followup_stat_by_partner')
         self._cr.execute("""
-            create view followup_stat_by_partner as (
+            create materialized view followup_stat_by_partner as (
                 SELECT
                     l.partner_id * 10000::bigint + l.company_id as id,
                     l.partner_id AS partner_id,
@@ -48,5 +50,23 @@ class FollowupStatByPartner(models.Model):
                     GROUP BY
                     l.partner_id, l.company_id
             )""")
+        self._cr.execute("""
+            CREATE UNIQUE INDEX followup_stat_by_partner_id_idx
+            ON followup_stat_by_partner (id)""")
+        self._cr.execute("""
+            CREATE INDEX followup_stat_by_partner_partner_company_idx
+            ON followup_stat_by_partner (partner_id, company_id)""")
 
+    @api.model
+    def _refresh(self):
+        """ Refresh the statistics from the open receivable lines, without
+        blocking the readers of the view """
+        self.env['account.move.line'].flush_model(
+            ['partner_id', 'company_id', 'account_id', 'full_reconcile_id', 'date',
+             'followup_date', 'followup_line_id', 'debit', 'credit'])
+        self._cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY followup_stat_by_partner")
+        self.invalidate_model()
 
+    @api.model
+    def _cron_refresh(self):
+        self._refresh()
@@ -1,13 +1,24 @@
 # -*- coding: utf-8 -*-
 
+import operator as py_operator
+from collections import defaultdict
 from functools import reduce
 from datetime import datetime
 from lxml import etree
-from odoo import api, fields, models, _
+from odoo import api, fields, models, _, Command
 from odoo.exceptions import ValidationError
 from odoo.tools.misc import formatLang
 from markupsafe import Markup
 
+FOLLOWUP_SEARCH_OPERATORS = {
+    '=': py_operator.eq,
+    '!=': py_operator.ne,
+    '>': py_operator.gt,
+    '>=': py_operator.ge,
+    '<': py_operator.lt,
+    '<=': py_operator.le,
+}
+
 
 class ResPartner(models.Model):
     _inherit = "res.partner"
@@ -25,29 +36,44 @@ class ResPartner(models.Model):
             res['arch'] = etree.tostring(doc, encoding="utf-8")
         return res
 
+    def _get_unreconciled_aml_query(self):
+        """ FROM and WHERE parts, with the record rules applied, of the query on the
+        open receivable lines of the current company of the partners of self """
+        partner_ids = [partner._origin.id for partner in self if partner._origin.id]
+        if not partner_ids:
+            return False
+        amls = self.env['account.move.line']
+        amls.flush_model(['partner_id', 'company_id', 'full_reconcile_id', 'account_id',
+                          'date', 'date_maturity', 'debit', 'credit', 'blocked',
+                          'followup_line_id', 'followup_date'])
+        query = amls._where_calc([
+            ('partner_id', 'in', partner_ids),
+            ('company_id', '=', self.env.company.id),
+            ('full_reconcile_id', '=', False),
+            ('account_id.account_type', '=', 'asset_receivable'),
+        ])
+        amls._apply_ir_rules(query, 'read')
+        return query.get_sql()
+
     def _get_latest(self):
-        company = self.env.company
+        res = {}
+        query = self._get_unreconciled_aml_query()
+        if query:
+            from_clause, where_clause, where_clause_params = query
+            self._cr.execute("""
+                SELECT "account_move_line".partner_id,
+                    MAX("account_move_line".followup_date),
+                    (ARRAY_AGG(fl.id ORDER BY fl.delay DESC NULLS LAST))[1],
+                    (ARRAY_AGG(fl.id ORDER BY fl.delay DESC NULLS LAST)
+                        FILTER (WHERE NOT COALESCE("account_move_line".blocked, FALSE)))[1]
+                FROM """ + from_clause + """
+                LEFT JOIN followup_line fl ON fl.id = "account_move_line".followup_line_id
+                WHERE """ + where_clause + """
+                GROUP BY "account_move_line".partner_id""", where_clause_params)
+            res = {row[0]: row[1:] for row in self._cr.fetchall()}
         for partner in self:
-            amls = partner.unreconciled_aml_ids
-            latest_date = False
-            latest_level = False
-            latest_days = False
-            latest_level_without_lit = False
-            latest_days_without_lit = False
-            for aml in amls:
-                aml_followup = aml.followup_line_id
-                if (aml.company_id == company) and aml_followup and \
-                        (not latest_days or latest_days < aml_followup.delay):
-                    latest_days = aml_followup.delay
-                    latest_level = aml_followup.id
-                if (aml.company_id == company) and aml.followup_date and (
-                        not latest_date or latest_date < aml.followup_date):
-                    latest_date = aml.followup_date
-                if (aml.company_id == company) and not aml.blocked and \
-                        (aml_followup and (not latest_days_without_lit or
-                         latest_days_without_lit < aml_followup.delay)):
-                    latest_days_without_lit = aml_followup.delay
-                    latest_level_without_lit = aml_followup.id
+            latest_date, latest_level, latest_level_without_lit = \
+                res.get(partner._origin.id, (False, False, False))
             partner.latest_followup_date = latest_date
             partner.latest_followup_level_id = latest_level
             partner.latest_followup_level_id_without_lit = latest_level_without_lit
@@ -101,11 +127,43 @@ class ResPartner(models.Model):
             'om_account_followup.action_report_followup').report_action(
             self, data=datas)
 
+    def _send_followup_mails(self, template):
+        """ Render template for all the partners of self at once and queue the
+        resulting mails, without sending them right away """
+        values_by_partner = template.generate_email(self.ids, [
+            'subject', 'body_html', 'email_from', 'email_cc', 'email_to',
+            'partner_to', 'reply_to', 'auto_delete', 'scheduled_date'])
+        mail_values = []
+        attachments_by_mail = []
+        for partner in self:
+            values = values_by_partner[partner.id]
+            values['recipient_ids'] = [Command.link(pid) for pid in values.pop('partner_ids', [])]
+            values['attachment_ids'] = [Command.link(aid) for aid in values.get('attachment_ids', [])]
+            if 'email_from' in values and not values.get('email_from'):
+                values.pop('email_from')
+            attachments_by_mail.append(values.pop('attachments', []))
+            values.update(model='res.partner', res_id=partner.id)
+            mail_values.append(values)
+        mails = self.env['mail.mail'].sudo().create(mail_values)
+        for mail, attachments in zip(mails, attachments_by_mail):
+            if attachments:
+                mail.attachment_ids = [Command.link(attachment.id) for attachment in self.env['ir.attachment'].create([{
+                    'name': name,
+                    'datas': content,
+                    'type': 'binary',
+                    'res_model': 'mail.message',
+                    'res_id': mail.mail_message_id.id,
+                } for name, content in attachments])]
+        return mails
+
     def do_partner_mail(self):
         ctx = self.env.context.copy()
         ctx['followup'] = True
         template = 'om_account_followup.email_template_om_account_followup_default'
+        default_template = self.env.ref(template)
         unknown_mails = 0
+        recipients_by_template = defaultdict(lambda: self.browse())
+        notes = {}
         for partner in self:
             partners_to_email = [child for child in partner.child_ids if
                                  child.type == 'invoice' and child.email]
@@ -113,21 +171,19 @@ class ResPartner(models.Model):
                 partners_to_email = [partner]
             if partners_to_email:
                 level = partner.latest_followup_level_id_without_lit
+                if level and level.send_email and \
+                        level.email_template_id and \
+                        level.email_template_id.id:
+                    mail_template = level.email_template_id
+                else:
+                    mail_template = default_template
                 for partner_to_email in partners_to_email:
-                    if level and level.send_email and \
-                            level.email_template_id and \
-                            level.email_template_id.id:
-                        level.email_template_id.with_context(ctx).send_mail(
-                            partner_to_email.id)
-                    else:
-                        mail_template_id = self.env.ref(template)
-                        mail_template_id.with_context(ctx).send_mail(
-                            partner_to_email.id)
+                    recipients_by_template[mail_template] |= partner_to_email
                 if partner not in partners_to_email:
-                    partner.message_post(body=_(
+                    notes[partner.id] = _(
                         'Overdue email sent to %s' % ', '.join(
                             ['%s <%s>' % (partner.name, partner.email) for
-                             partner in partners_to_email])))
+                             partner in partners_to_email]))
             else:
                 unknown_mails = unknown_mails + 1
                 action_text = _("Email not sent because of email address "
@@ -146,6 +202,17 @@ class ResPartner(models.Model):
                 partner.with_context(ctx).write(
                     {'payment_next_action_date': payment_action_date,
                      'payment_next_action': payment_next_action})
+
+        # render every body from the overdue lines of all the partners, fetched at once
+        recipients = self.browse().union(*recipients_by_template.values())
+        if recipients:
+            report = self.env['report.om_account_followup.report_followup']
+            ctx['followup_lines'] = report._lines_get_with_partners(
+                recipients.commercial_partner_id, self.env.company.id)
+            for mail_template, template_recipients in recipients_by_template.items():
+                template_recipients.with_context(ctx)._send_followup_mails(mail_template.with_context(ctx))
+        if notes:
+            self.browse(notes)._message_log_batch(bodies=notes)
         return unknown_mails
 
     def get_followup_table_html(self):
@@ -155,8 +222,12 @@ class ResPartner(models.Model):
         if partner.unreconciled_aml_ids:
             company = self.env.company
             current_date = fields.Date.today()
-            report = self.env['report.om_account_followup.report_followup']
-            final_res = report._lines_get_with_partner(partner, company.id)
+            followup_lines = self.env.context.get('followup_lines') or {}
+            if partner.id in followup_lines:
+                final_res = followup_lines[partner.id]
+            else:
+                report = self.env['report.om_account_followup.report_followup']
+                final_res = report._lines_get_with_partner(partner, company.id)
 
             for currency_dict in final_res:
                 currency = currency_dict.get('line', [
@@ -255,100 +326,104 @@ class ResPartner(models.Model):
         return self.do_partner_print(wizard_partner_ids, data)
 
     def _get_amounts_and_date(self):
-        company = self.env.company
-        current_date = fields.Date.today()
+        res = {}
+        query = self._get_unreconciled_aml_query()
+        if query:
+            from_clause, where_clause, where_clause_params = query
+            self._cr.execute("""
+                SELECT "account_move_line".partner_id,
+                    SUM("account_move_line".debit - "account_move_line".credit),
+                    SUM("account_move_line".debit - "account_move_line".credit) FILTER (
+                        WHERE COALESCE("account_move_line".date_maturity, "account_move_line".date) <= %s),
+                    MIN(COALESCE("account_move_line".date_maturity, "account_move_line".date))
+                FROM """ + from_clause + """
+                WHERE """ + where_clause + """
+                GROUP BY "account_move_line".partner_id""",
+                [fields.Date.today()] + where_clause_params)
+            res = {row[0]: row[1:] for row in self._cr.fetchall()}
         for partner in self:
-            worst_due_date = False
-            amount_due = amount_overdue = 0.0
-            for aml in partner.unreconciled_aml_ids:
-                if (aml.company_id == company):
-                    date_maturity = aml.date_maturity or aml.date
-                    if not worst_due_date or date_maturity < worst_due_date:
-                        worst_due_date = date_maturity
-                    amount_due += aml.result
-                    if (date_maturity <= current_date):
-                        amount_overdue += aml.result
+            amount_due, amount_overdue, worst_due_date = \
+                res.get(partner._origin.id, (0.0, 0.0, False))
             partner.payment_amount_due = amount_due
-            partner.payment_amount_overdue = amount_overdue
+            partner.payment_amount_overdue = amount_overdue or 0.0
             partner.payment_earliest_due_date = worst_due_date
 
-    def _get_followup_overdue_query(self, args, overdue_only=False):
-        company_id = self.env.company.id
+    def _get_followup_overdue_query(self, args, overdue_only=False, negate=False):
+        """ Return the partners having open receivable lines whose balance
+        matches args (or does not match them if negate). Only the partners with
+        open lines are aggregated, using account_move_line_followup_open_idx. """
         having_clauses = []
         having_values = []
 
         for field, operator, value in args:
-            if operator in ['=', '!=', '>', '>=', '<', '<=']:
-                having_clauses.append(f'SUM(bal2) {operator} %s')
-                having_values.append(value)
-            else:
+            if operator not in FOLLOWUP_SEARCH_OPERATORS:
                 raise ValueError(f"Unsupported operator: {operator}")
+            having_clauses.append(f'SUM(l.debit - l.credit) {operator} %s')
+            having_values.append(value)
 
         having_where_clause = ' AND '.join(having_clauses)
-        overdue_only_str = 'AND date_maturity <= NOW()' if overdue_only else ''
-
-        query = ('''
-            SELECT pid AS partner_id, SUM(bal2) FROM (
-                SELECT 
-                    CASE WHEN bal IS NOT NULL THEN bal ELSE 0.0 END AS bal2, 
-                    p.id as pid 
-                FROM (
-                    SELECT 
-                        (debit - credit) AS bal, 
-                        partner_id 
-                    FROM account_move_line l
-                    LEFT JOIN account_account a ON a.id = l.account_id
-                    WHERE a.account_type = 'asset_receivable'
-                    %s AND full_reconcile_id IS NULL
-                    AND l.company_id = %%s
-                ) AS l
-                RIGHT JOIN res_partner p ON p.id = partner_id 
-            ) AS pl
-            GROUP BY pid HAVING %s
-        ''') % (overdue_only_str, having_where_clause)
-
-        params = [company_id] + having_values
+        if negate:
+            having_where_clause = f'NOT ({having_where_clause})'
+        overdue_only_str = 'AND l.date_maturity <= %s' if overdue_only else ''
+
+        query = f'''
+            SELECT l.partner_id, SUM(l.debit - l.credit)
+            FROM account_move_line l
+            JOIN account_account a ON a.id = l.account_id
+            WHERE l.company_id = %s
+            AND l.full_reconcile_id IS NULL
+            AND l.partner_id IS NOT NULL
+            AND a.account_type = 'asset_receivable'
+            {overdue_only_str}
+            GROUP BY l.partner_id HAVING {having_where_clause}
+        '''
+
+        params = [self.env.company.id]
+        if overdue_only:
+            params.append(fields.Date.context_today(self))
+        params += having_values
         return query, params
 
-    def _payment_overdue_search(self, operator, operand):
-        args = [('payment_amount_overdue', operator, operand)]
-        query, params = self._get_followup_overdue_query(args, overdue_only=True)
+    def _followup_amount_search(self, field, operator, operand, overdue_only):
+        if operator not in FOLLOWUP_SEARCH_OPERATORS:
+            raise ValueError(f"Unsupported operator: {operator}")
+        args = [(field, operator, operand or 0.0)]
+        # the partners without open lines have an amount of 0, exclude the
+        # partners that do not match rather than listing all the others
+        negate = FOLLOWUP_SEARCH_OPERATORS[operator](0.0, operand or 0.0)
+        query, params = self._get_followup_overdue_query(
+            args, overdue_only=overdue_only, negate=negate)
         self._cr.execute(query, params)
-        res = self._cr.fetchall()
-        if not res:
+        partner_ids = [x[0] for x in self._cr.fetchall()]
+        if negate:
+            return [('id', 'not in', partner_ids)]
+        if not partner_ids:
             return [('id', '=', '0')]
-        return [('id', 'in', [x[0] for x in res])]
+        return [('id', 'in', partner_ids)]
+
+    def _payment_overdue_search(self, operator, operand):
+        return self._followup_amount_search(
+            'payment_amount_overdue', operator, operand, overdue_only=True)
 
     def _payment_earliest_date_search(self, operator, operand):
-        args = [('payment_earliest_due_date', operator, operand)]
-        company_id = self.env.company.id
-        having_where_clause = ' AND '.join(
-            map(lambda x: "(MIN(l.date_maturity) %s '%%s')" % (x[1]), args))
-        having_values = [x[2] for x in args]
-        having_where_clause = having_where_clause % (having_values[0])
-        query = """SELECT partner_id FROM account_move_line l
-                LEFT JOIN account_account a ON a.id = l.account_id
-                WHERE a.account_type = 'asset_receivable' 
-                AND l.company_id = %s 
-                AND l.full_reconcile_id IS NULL 
-                AND partner_id IS NOT NULL GROUP BY partner_id"""
-        query = query % (company_id)
-        if having_where_clause:
-            query += ' HAVING %s ' % (having_where_clause)
-        self._cr.execute(query)
+        if operator not in FOLLOWUP_SEARCH_OPERATORS:
+            raise ValueError(f"Unsupported operator: {operator}")
+        query = f"""SELECT l.partner_id FROM account_move_line l
+                JOIN account_account a ON a.id = l.account_id
+                WHERE a.account_type = 'asset_receivable'
+                AND l.company_id = %s
+                AND l.full_reconcile_id IS NULL
+                AND l.partner_id IS NOT NULL GROUP BY l.partner_id
+                HAVING MIN(l.date_maturity) {operator} %s"""
+        self._cr.execute(query, [self.env.company.id, operand])
         res = self._cr.fetchall()
         if not res:
             return [('id', '=', '0')]
         return [('id', 'in', [x[0] for x in res])]
 
     def _payment_due_search(self, operator, operand):
-        args = [('payment_amount_due', operator, operand)]
-        query, params = self._get_followup_overdue_query(args, overdue_only=False)
-        self._cr.execute(query, params)
-        res = self._cr.fetchall()
-        if not res:
-            return [('id', '=', '0')]
-        return [('id', 'in', [x[0] for x in res])]
+        return self._followup_amount_search(
+            'payment_amount_due', operator, operand, overdue_only=False)
 
     def _get_partners(self):
         partners = set()
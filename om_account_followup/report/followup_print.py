@@ -16,6 +16,10 @@ class ReportFollowup(models.AbstractModel):
         model = self.env['followup.sending.results']
         ids = self.env.context.get('active_ids') or False
         docs = model.browse(ids)
+        data = data and data['form'] or {}
+        # fetch the lines and texts of all the letters before rendering them
+        stat_lines = self.env['followup.stat.by.partner'].browse(
+            set(data.get('partner_ids', [])))
         return {
             'docs': docs,
             'doc_ids': docids,
@@ -24,7 +28,9 @@ class ReportFollowup(models.AbstractModel):
             'ids_to_objects': self._ids_to_objects,
             'getLines': self._lines_get,
             'get_text': self._get_text,
-            'data': data and data['form'] or {}}
+            'lines': self._lines_get_all(stat_lines),
+            'texts': stat_lines and self._get_texts(stat_lines, data['followup_id']) or {},
+            'data': data}
 
     def _ids_to_objects(self, ids):
         all_lines = []
@@ -33,21 +39,35 @@ class ReportFollowup(models.AbstractModel):
                 all_lines.append(line)
         return all_lines
 
+    def _lines_get_all(self, stat_lines):
+        """ Return the lines of every statistic line, fetched with one search per company """
+        res = {}
+        for company in stat_lines.company_id:
+            company_stat_lines = stat_lines.filtered(lambda stat: stat.company_id == company)
+            lines = self._lines_get_with_partners(company_stat_lines.partner_id, company.id)
+            for stat_line in company_stat_lines:
+                res[stat_line.id] = lines[stat_line.partner_id.id]
+        return res
+
     def _lines_get(self, stat_by_partner_line):
         return self._lines_get_with_partner(stat_by_partner_line.partner_id,
                                             stat_by_partner_line.company_id.id)
 
     def _lines_get_with_partner(self, partner, company_id):
+        return self._lines_get_with_partners(partner, company_id)[partner.id]
+
+    def _lines_get_with_partners(self, partners, company_id):
+        """ Return the overdue lines of all the partners, fetched at once and
+        grouped by partner and currency """
         moveline_obj = self.env['account.move.line']
         moveline_ids = moveline_obj.search(
-            [('partner_id', '=', partner.id),
+            [('partner_id', 'in', partners.ids),
              ('account_id.account_type', '=', 'asset_receivable'),
              ('full_reconcile_id', '=', False),
              ('company_id', '=', company_id),
              '|', ('date_maturity', '=', False),
              ('date_maturity', '<=', fields.Date.today())])
-        lines_per_currency = defaultdict(list)
-        total = 0
+        lines_per_partner = {partner.id: defaultdict(list) for partner in partners}
         for line in moveline_ids:
             currency = line.currency_id or line.company_id.currency_id
             balance = line.debit - line.credit
@@ -62,14 +82,21 @@ class ReportFollowup(models.AbstractModel):
                 'blocked': line.blocked,
                 'currency_id': currency,
             }
-            total = total + line_data['balance']
-            lines_per_currency[currency].append(line_data)
+            lines_per_partner[line.partner_id.id][currency].append(line_data)
 
-        return [{'total': total, 'line': lines, 'currency': currency} for
-                currency, lines in
-                lines_per_currency.items()]
+        return {
+            partner_id: [{'total': sum(line['balance'] for line in lines), 'line': lines, 'currency': currency}
+                         for currency, lines in lines_per_currency.items()]
+            for partner_id, lines_per_currency in lines_per_partner.items()
+        }
 
     def _get_text(self, stat_line, followup_id, context=None):
+        return self._get_texts(stat_line, followup_id)[stat_line.id]
+
+    def _get_texts(self, stat_lines, followup_id):
+        """ Return the text of the letter of every statistic line: the description
+        of the highest follow-up level reached by its open lines, found for all
+        of them with one grouped query """
         fp_obj = self.env['followup.followup']
         fp_line = fp_obj.browse(followup_id).followup_line
         if not fp_line:
@@ -77,38 +104,52 @@ class ReportFollowup(models.AbstractModel):
                 _("The followup plan defined for the current company does not "
                   "have any followup action."))
         default_text = ''
-        li_delay = []
         for line in fp_line:
             if not default_text and line.description:
                 default_text = line.description
-            li_delay.append(line.delay)
-        li_delay.sort(reverse=True)
-        partner_line_ids = self.env['account.move.line'].search(
-            [('partner_id', '=', stat_line.partner_id.id),
+
+        amls = self.env['account.move.line']
+        amls.flush_model(['partner_id', 'company_id', 'full_reconcile_id', 'blocked',
+                          'debit', 'account_id', 'followup_line_id'])
+        query = amls._where_calc(
+            [('partner_id', 'in', stat_lines.partner_id.ids),
              ('full_reconcile_id', '=', False),
-             ('company_id', '=', stat_line.company_id.id),
+             ('company_id', 'in', stat_lines.company_id.ids),
              ('blocked', '=', False),
              ('debit', '!=', False),
              ('account_id.account_type', '=', 'asset_receivable'),
              ('followup_line_id', '!=', False)])
+        amls._apply_ir_rules(query, 'read')
+        from_clause, where_clause, where_clause_params = query.get_sql()
+        self._cr.execute("""
+            SELECT "account_move_line".partner_id, "account_move_line".company_id,
+                ARRAY_AGG(DISTINCT "account_move_line".followup_line_id)
+            FROM """ + from_clause + """
+            WHERE """ + where_clause + """
+            GROUP BY "account_move_line".partner_id, "account_move_line".company_id""",
+            where_clause_params)
+        levels = {(partner_id, company_id): self.env['followup.line'].browse(level_ids)
+                  for partner_id, company_id, level_ids in self._cr.fetchall()}
 
-        partner_max_delay = 0
-        partner_max_text = ''
-        for i in partner_line_ids:
-            if i.followup_line_id.delay > partner_max_delay and \
-                    i.followup_line_id.description:
-                partner_max_delay = i.followup_line_id.delay
-                partner_max_text = i.followup_line_id.description
-        text = partner_max_delay and partner_max_text or default_text
-        if text:
-            lang_obj = self.env['res.lang']
-            lang_ids = lang_obj.search(
-                [('code', '=', stat_line.partner_id.lang)], limit=1)
-            date_format = lang_ids and lang_ids.date_format or '%Y-%m-%d'
-            text = text % {
-                'partner_name': stat_line.partner_id.name,
-                'date': time.strftime(date_format),
-                'company_name': stat_line.company_id.name,
-                'user_signature': self.env.user.signature or '',
-            }
-        return text
+        langs = self.env['res.lang'].search(
+            [('code', 'in', list(set(stat_lines.partner_id.mapped('lang'))))])
+        date_formats = {lang.code: lang.date_format for lang in langs}
+        res = {}
+        for stat_line in stat_lines:
+            partner_max_delay = 0
+            partner_max_text = ''
+            for level in levels.get((stat_line.partner_id.id, stat_line.company_id.id), []):
+                if level.delay > partner_max_delay and level.description:
+                    partner_max_delay = level.delay
+                    partner_max_text = level.description
+            text = partner_max_delay and partner_max_text or default_text
+            if text:
+                date_format = date_formats.get(stat_line.partner_id.lang) or '%Y-%m-%d'
+                text = text % {
+                    'partner_name': stat_line.partner_id.name,
+                    'date': time.strftime(date_format),
+                    'company_name': stat_line.company_id.name,
+                    'user_signature': self.env.user.signature or '',
+                }
+            res[stat_line.id] = text
+        return res
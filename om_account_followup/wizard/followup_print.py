@@ -52,6 +52,8 @@ class FollowupPrint(models.TransientModel):
         nbunknownmails = 0
         nbprints = 0
         resulttext = " "
+        partners_to_mail = partner_obj
+        letter_notes = {}
         for partner in self.env['followup.stat.by.partner'].browse(
                 partner_ids):
             if partner.max_followup_id.manual_action:
@@ -64,7 +66,7 @@ class FollowupPrint(models.TransientModel):
                 else:
                     manuals[key] = manuals[key] + 1
             if partner.max_followup_id.send_email:
-                nbunknownmails += partner.partner_id.do_partner_mail()
+                partners_to_mail |= partner.partner_id
                 nbmails += 1
             if partner.max_followup_id.send_letter:
                 partner_ids_to_print.append(partner.id)
@@ -74,7 +76,12 @@ class FollowupPrint(models.TransientModel):
                 message = "%s<I> %s </I>%s" % (_("Follow-up letter of "),
                                                followup_without_lit.name,
                                                _(" will be sent"))
-                partner.partner_id.message_post(body=message)
+                letter_notes[partner.partner_id.id] = message
+        if partners_to_mail:
+            nbunknownmails += partners_to_mail.do_partner_mail()
+        if letter_notes:
+            partner_obj.browse(letter_notes)._message_log_batch(
+                bodies=letter_notes)
         if nbunknownmails == 0:
             resulttext += str(nbmails) + _(" email(s) sent")
         else:
@@ -133,6 +140,7 @@ class FollowupPrint(models.TransientModel):
         data['followup_id'] = data['followup_id'][0]
 
         self.do_update_followup_level(to_update, partner_list, date)
+        self.env['followup.stat.by.partner']._refresh()
         restot_context = context.copy()
         restot = self.with_context(restot_context).process_partners(
             partner_list, data)
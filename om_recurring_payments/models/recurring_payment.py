@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import logging
+import threading
 from datetime import date
 from dateutil.relativedelta import relativedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
 
 
 class RecurringPayment(models.Model):
@@ -50,9 +55,8 @@ class RecurringPayment(models.Model):
             date += relativedelta(years=interval)
         return date
 
-    def action_create_lines(self, date):
-        ids = self.env['recurring.payment.line']
-        vals = {
+    def _prepare_line_vals(self, date):
+        return {
             'partner_id': self.partner_id.id,
             'amount': self.amount,
             'date': date,
@@ -61,29 +65,35 @@ class RecurringPayment(models.Model):
             'currency_id': self.currency_id.id,
             'state': 'draft'
         }
-        ids.create(vals)
 
-    def action_done(self):
+    def _get_schedule_dates(self):
+        dates = []
         date_begin = self.date_begin
         while date_begin < self.date_end:
-            date = date_begin
-            self.action_create_lines(date)
-            date_begin = self.compute_next_date(date)
-        self.state = 'done'
+            dates.append(date_begin)
+            date_begin = self.compute_next_date(date_begin)
+        return dates
+
+    def action_create_lines(self, date):
+        self.env['recurring.payment.line'].create(self._prepare_line_vals(date))
+
+    def action_done(self):
+        self.env['recurring.payment.line'].create([
+            rec._prepare_line_vals(date) for rec in self for date in rec._get_schedule_dates()
+        ])
+        self.write({'state': 'done'})
 
     def action_draft(self):
         if self.line_ids.filtered(lambda t: t.state == 'done'):
             raise ValidationError(_('You cannot Set to Draft as one of the line is already in done state'))
         else:
-            for line in self.line_ids:
-                line.unlink()
-            self.state = 'draft'
+            self.line_ids.unlink()
+            self.write({'state': 'draft'})
 
     def action_generate_payment(self):
         line_ids = self.env['recurring.payment.line'].search([('date', '<=', date.today()),
                                                                        ('state', '!=', 'done')])
-        for line in line_ids:
-            line.action_create_payment()
+        line_ids._generate_payments()
 
     @api.model_create_multi
     def create(self, vals_list):
@@ -121,9 +131,10 @@ class RecurringPaymentLine(models.Model):
     payment_id = fields.Many2one('account.payment', string='Payment')
     state = fields.Selection(selection=[('draft', 'Draft'),
                                         ('done', 'Done')], default='draft', string='Status')
+    error_message = fields.Text('Error', readonly=True, copy=False)
 
-    def action_create_payment(self):
-        vals = {
+    def _prepare_payment_vals(self):
+        return {
             'payment_type': self.recurring_payment_id.payment_type,
             'amount': self.amount,
             'currency_id': self.currency_id.id,
@@ -133,9 +144,36 @@ class RecurringPaymentLine(models.Model):
             'ref': self.recurring_payment_id.name,
             'partner_id': self.partner_id.id,
         }
-        payment = self.env['account.payment'].create(vals)
-        if payment:
-            if self.recurring_payment_id.journal_state == 'posted':
-                payment.action_post()
-            self.write({'state': 'done', 'payment_id': payment.id})
+
+    def action_create_payment(self):
+        payments = self.env['account.payment'].create([line._prepare_payment_vals() for line in self])
+        payments.browse([
+            payment.id for line, payment in zip(self, payments)
+            if line.recurring_payment_id.journal_state == 'posted'
+        ]).action_post()
+        for line, payment in zip(self, payments):
+            line.write({'state': 'done', 'payment_id': payment.id, 'error_message': False})
+
+    def _generate_payments(self, chunk_size=100):
+        """ Create (and post) the payments of the lines in chunks, committing after each
+        chunk. When a chunk fails, its lines are retried one by one and the error is
+        recorded on the faulty lines instead of aborting the whole run. """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        for line_ids in split_every(chunk_size, self.ids):
+            lines = self.browse(line_ids)
+            try:
+                with self.env.cr.savepoint():
+                    lines.action_create_payment()
+            except Exception:
+                self.env.invalidate_all()
+                for line in lines:
+                    try:
+                        with self.env.cr.savepoint():
+                            line.action_create_payment()
+                    except Exception as e:
+                        self.env.invalidate_all()
+                        _logger.exception('Payment generation of recurring payment line %s failed', line.id)
+                        line.error_message = str(e)
+            if auto_commit:
+                self.env.cr.commit()
 
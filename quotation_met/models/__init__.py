@@ -13,4 +13,5 @@ from . import pos_order
 from . import res_config_setting
 from . import stock_move
 from . import stock_picking
-from . import purchase_order
\ No newline at end of file
+from . import purchase_order
+from . import pos_session
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, models
+
+
+class PosSession(models.Model):
+    _inherit = "pos.session"
+
+    def _clear_open_session_cache(self):
+        """invalidate sale.order's cached 'user has an open POS session' check"""
+        self.env["sale.order"].clear_caches()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        sessions = super(PosSession, self).create(vals_list)
+        self._clear_open_session_cache()
+        return sessions
+
+    def write(self, vals):
+        res = super(PosSession, self).write(vals)
+        if "state" in vals or "user_id" in vals:
+            self._clear_open_session_cache()
+        return res
+
+    def unlink(self):
+        res = super(PosSession, self).unlink()
+        self._clear_open_session_cache()
+        return res
@@ -3,7 +3,7 @@
 import logging
 from datetime import datetime, timedelta
 
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
@@ -199,53 +199,64 @@ class SaleOrder(models.Model):
         return invoice_vals
 
     @api.model
-    def search_read(self, domain=None, fields=None, offset=0, limit=None, order=None):
-        """filter sale orders to credit when searching from the POS"""
-        # verify if the user has a POS session opened
-        # if the user has a POS session opened, apply the filter to exclude invoice_type = 'credito'
-        # and exclude quotations (only show confirmed sale orders with state = 'sale')
-        try:
-            pos_session = (
-                self.env["pos.session"]
-                .sudo()
-                .search(
-                    [("user_id", "=", self.env.uid), ("state", "=", "opened")], limit=1
-                )
+    @tools.ormcache("uid")
+    def _user_has_open_pos_session(self, uid):
+        """Cached check of whether the user has an opened POS session.
+
+        The cache is cleared by pos.session whenever a session is created
+        or changes state, see ``PosSession._clear_open_session_cache``.
+        """
+        return bool(
+            self.env["pos.session"]
+            .sudo()
+            .search_count(
+                [("user_id", "=", uid), ("state", "=", "opened")], limit=1
             )
+        )
 
-            if pos_session:
-                domain = domain or []
+    def _is_pos_sale_order_search(self):
+        """Only the POS frontend flags its sale order lookups with the
+        ``pos_sale_order_search`` context key; the rest of the server
+        (name_search, computed fields, crons...) is left untouched"""
+        return bool(
+            self.env.context.get("pos_sale_order_search")
+            and self._user_has_open_pos_session(self.env.uid)
+        )
 
-                # if the user has a POS session opened, apply the filter to exclude invoice_type = 'credito'
-                if "invoice_type" in self.env["sale.order"]._fields:
-                    # add the condition to exclude invoice_type = 'credito'
-                    domain = domain + [("invoice_type", "!=", "credito")]
-                    _logger.info(
-                        "Filtering sale orders from POS (search_read): excluding invoice_type=credito"
-                    )
+    @api.model
+    def _get_pos_sale_order_domain(self, domain):
+        """exclude invoice_type = 'credito' and quotations (only show
+        confirmed sale orders with state = 'sale')"""
+        domain = list(domain or [])
+        if "invoice_type" in self._fields:
+            domain += [("invoice_type", "!=", "credito")]
+        domain += [("state", "=", "sale")]
+        _logger.debug(
+            "Filtering sale orders from POS: excluding invoice_type=credito and quotations"
+        )
+        return domain
 
-                # Exclude quotations (draft, sent) - only show confirmed sale orders
-                domain = domain + [("state", "=", "sale")]
-                _logger.info(
-                    "Filtering sale orders from POS (search_read): excluding quotations, only showing confirmed orders"
-                )
+    @api.model
+    def search_read(self, domain=None, fields=None, offset=0, limit=None, order=None):
+        """filter sale orders to credit when searching from the POS"""
+        from_pos = self._is_pos_sale_order_search()
+        if from_pos:
+            domain = self._get_pos_sale_order_domain(domain)
 
             # Ensure order_line is included when reading from POS
-            if pos_session and fields is not None:
-                fields = list(fields) if isinstance(fields, (list, tuple)) else fields
-                if isinstance(fields, list) and "order_line" not in fields:
+            if fields is not None:
+                fields = list(fields)
+                if "order_line" not in fields:
                     fields.append("order_line")
-        except Exception as e:
-            _logger.debug("Error verifying POS session: %s", str(e))
 
         result = super(SaleOrder, self).search_read(
             domain=domain, fields=fields, offset=offset, limit=limit, order=order
         )
 
         # Ensure order_line exists in all results (set to empty list if missing)
-        if isinstance(result, list):
+        if from_pos:
             for record in result:
-                if isinstance(record, dict) and "order_line" not in record:
+                if "order_line" not in record:
                     record["order_line"] = []
 
         return result
@@ -253,36 +264,8 @@ class SaleOrder(models.Model):
     @api.model
     def search(self, domain, offset=0, limit=None, order=None, count=False):
         """filter sale orders to credit when searching from the POS"""
-        # verify if the user has a POS session opened
-        # if the user has a POS session opened, apply the filter to exclude invoice_type = 'credito'
-        # and exclude quotations (only show confirmed sale orders with state = 'sale')
-        try:
-            pos_session = (
-                self.env["pos.session"]
-                .sudo()
-                .search(
-                    [("user_id", "=", self.env.uid), ("state", "=", "opened")], limit=1
-                )
-            )
-
-            if pos_session:
-                domain = domain or []
-
-                # if the user has a POS session opened, apply the filter to exclude invoice_type = 'credito'
-                if "invoice_type" in self.env["sale.order"]._fields:
-                    # add the condition to exclude invoice_type = 'credito'
-                    domain = domain + [("invoice_type", "!=", "credito")]
-                    _logger.info(
-                        "Filtering sale orders from POS (search): excluding invoice_type=credito"
-                    )
-
-                # Exclude quotations (draft, sent) - only show confirmed sale orders
-                domain = domain + [("state", "=", "sale")]
-                _logger.info(
-                    "Filtering sale orders from POS (search): excluding quotations, only showing confirmed orders"
-                )
-        except Exception as e:
-            _logger.debug("Error verifying POS session: %s", str(e))
+        if self._is_pos_sale_order_search():
+            domain = self._get_pos_sale_order_domain(domain)
 
         return super(SaleOrder, self).search(
             domain, offset=offset, limit=limit, order=order, count=count